@@ -0,0 +1,109 @@
+# asset_registry.py
+
+import csv
+import os
+import threading
+from collections.abc import Mapping
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIR = os.getenv("ASSET_REGISTRY_DIR", PROJECT_DIR)  # Where the registry CSVs live
+LIST_SEPARATOR = ";"  # Multi-value columns (tags): "tense;stealth"
+
+# -------------------------------------------------------------
+# 2. THE REGISTRY (Lazy CSV Load, Inverted Indexes)
+
+class AssetRegistry(Mapping):
+    """
+    Read-only registry of assets (voices, moods, sound effects) backed by a
+    CSV file with a 'key' column. Behaves like the dict literals it replaces
+    (registry[key]['field'], keys() in file order), but nothing is read until
+    first use, and the indexed columns get inverted indexes
+    (value -> set of keys), so tag/type queries never scan the library.
+    """
+
+    def __init__(self, csv_path, list_fields=("tags",), indexed_fields=("tags",), null_fields=()):
+        self.csv_path = csv_path
+        self.list_fields = tuple(list_fields)
+        self.indexed_fields = tuple(indexed_fields)
+        self.null_fields = tuple(null_fields)  # Empty cells become None
+        self._entries = None  # key -> entry dict (insertion order = file order)
+        self._indexes = None  # field -> {value: set of keys}
+        self._lock = threading.Lock()
+
+    def _parse(self, row):
+        entry = {}
+        for field, value in row.items():
+            if field == "key":
+                continue
+            value = value or ""
+            if field in self.list_fields:
+                entry[field] = [part.strip() for part in value.split(LIST_SEPARATOR) if part.strip()]
+            elif field in self.null_fields and not value:
+                entry[field] = None
+            else:
+                entry[field] = value
+        return entry
+
+    def _load(self):
+        entries = {}
+        indexes = {field: {} for field in self.indexed_fields}
+        with open(self.csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                key = row["key"]
+                entry = self._parse(row)
+                entries[key] = entry
+                for field, index in indexes.items():
+                    values = entry.get(field)
+                    for value in (values if isinstance(values, list) else [values]):
+                        if value:
+                            index.setdefault(value, set()).add(key)
+        return entries, indexes
+
+    def _loaded(self):
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    entries, self._indexes = self._load()
+                    self._entries = entries
+        return self._entries
+
+    # Mapping interface (what the engines already use)
+    def __getitem__(self, key):
+        return self._loaded()[key]
+
+    def __iter__(self):
+        return iter(self._loaded())
+
+    def __len__(self):
+        return len(self._loaded())
+
+    def is_loaded(self):
+        return self._entries is not None
+
+    # ---------------------------------------------------------
+    # 3. QUERIES
+
+    def find(self, **criteria):
+        """
+        Keys matching every criterion, e.g. find(tags=["tense", "stealth"], type="ambient").
+        A list value means all of its values must match. Returns a set.
+        """
+        self._loaded()
+        postings = []
+        for field, wanted in criteria.items():
+            if field not in self._indexes:
+                raise ValueError(f"'{field}' is not an indexed field of {os.path.basename(self.csv_path)}")
+            for value in ([wanted] if isinstance(wanted, str) else wanted):
+                postings.append(self._indexes[field].get(value, set()))
+        if not postings:
+            return set(self._entries)
+        postings.sort(key=len)  # Intersect from the rarest value up
+        return set(postings[0]).intersection(*postings[1:])
+
+    def field_values(self, field):
+        """Distinct values of an indexed field (e.g. every tag in use), sorted."""
+        self._loaded()
+        return sorted(self._indexes[field])
@@ -0,0 +1,197 @@
+# asset_store.py
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+ASSET_STORE_DIR = os.getenv("ASSET_STORE_DIR", ".asset_store")
+INDEX_FILE = "index.json"
+OBJECTS_DIR = "objects"
+HASH_BLOCK_BYTES = 1024 * 1024
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class AssetIntegrityError(Exception):
+    """A stored asset no longer matches its content hash and no intact source is left."""
+
+
+def file_digest(path):
+    """sha256 of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# -------------------------------------------------------------
+# 2. THE STORE (Content-addressed Music & SFX Files)
+
+class AssetStore:
+    """
+    Content-addressed store for audio assets. Every source file (an SFX
+    file_path, a music_library.csv track) is identified by the sha256 of
+    its bytes and kept once under objects/ (hard-linked to the source when
+    the filesystem allows, copied otherwise), so byte-identical files share
+    one object and one decoded copy in the caches keyed on the digest.
+
+    Source digests are remembered with the file's size and mtime, so a file
+    is only hashed again when it changes. Objects are verified lazily: the
+    first time one is used in a process it is re-hashed, and a damaged
+    object is restored from an intact source or reported.
+    """
+
+    def __init__(self, root=ASSET_STORE_DIR):
+        self.root = root
+        self._sources = None  # abs source path -> {"size", "mtime_ns", "digest"}
+        self._verified = set()
+        self._dirty = False  # Index entries not saved yet (digest(save=False))
+        self._lock = threading.RLock()
+
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, OBJECTS_DIR, digest[:2], digest)
+
+    def _load_index(self):
+        if self._sources is None:
+            try:
+                with open(self._index_path(), encoding="utf-8") as f:
+                    self._sources = json.load(f).get("sources", {})
+            except (OSError, ValueError):
+                self._sources = {}  # First run (or an unreadable index): hash on demand
+        return self._sources
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"sources": self._sources}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self._index_path())
+            self._dirty = False
+        except OSError as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            print(f"⚠️ Warning: Could not save the asset index: {e}")
+
+    def _ingest(self, source, digest):
+        """Puts source's bytes under objects/ unless an object with that digest exists."""
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)  # Other filesystem (or no hard links)
+        os.replace(tmp_path, target)
+        return target
+
+    def digest(self, path, save=True):
+        """
+        Content hash of the file at path (None if it does not exist). With
+        save=False a new entry is only saved by the next save or digests().
+        """
+        source = os.path.abspath(path)
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        with self._lock:
+            known = self._load_index().get(source)
+            if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                return known["digest"]
+            digest = file_digest(source)
+            self._ingest(source, digest)
+            self._sources[source] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}
+            self._dirty = True
+            if save:
+                self._save_index()
+            return digest
+
+    def digests(self, paths):
+        """digest() of many files (path -> digest or None), with one index save at the end."""
+        result = {path: self.digest(path, save=False) for path in paths}
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+        return result
+
+    def known_digest(self, path):
+        """Digest of path if it is indexed and unchanged since, else None. Never hashes."""
+        source = os.path.abspath(path)
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        with self._lock:
+            known = self._load_index().get(source)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["digest"]
+        return None
+
+    def verify(self, digest):
+        """
+        Re-hashes an object once per process. A damaged or missing object is
+        restored from a source with the same content; raises
+        AssetIntegrityError if there is none.
+        """
+        with self._lock:
+            if digest in self._verified:
+                return self.object_path(digest)
+            target = self.object_path(digest)
+            if not (os.path.exists(target) and file_digest(target) == digest):
+                self._restore(digest)
+            self._verified.add(digest)
+            return target
+
+    def _restore(self, digest):
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            os.remove(target)  # Also unlinks a hard link to a source edited in place
+        for source, known in self._load_index().items():
+            if known["digest"] == digest and os.path.exists(source) and file_digest(source) == digest:
+                print(f"⚠️ Warning: Asset {digest[:12]} was damaged, restored from {source}.")
+                self._ingest(source, digest)
+                return
+        raise AssetIntegrityError(f"Asset {digest[:12]} is damaged and no intact copy is left.")
+
+    def resolve(self, path):
+        """
+        Returns (digest, object path) for the asset at path, verified, or
+        (None, None) if the file does not exist.
+        """
+        digest = self.digest(path)
+        if digest is None:
+            return None, None
+        return digest, self.verify(digest)
+
+    def stats(self):
+        """Sources seen, unique objects and the bytes saved by deduplication."""
+        with self._lock:
+            sources = self._load_index()
+            unique = {known["digest"]: known["size"] for known in sources.values()}
+            return {"sources": len(sources), "unique": len(unique),
+                    "bytes_deduplicated": sum(k["size"] for k in sources.values()) - sum(unique.values())}
+
+
+def get_store():
+    """Returns the shared AssetStore (one per process, created on first use)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AssetStore()
+    return _store
@@ -0,0 +1,82 @@
+# audio_formats.py
+
+import io
+import os
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION (override via .env)
+
+# What the API is asked for. MP3 works on every plan. "pcm_44100" skips the
+# local MP3 decode and the extra lossy generation, but ElevenLabs only serves
+# it on Pro plans and above (other plans get a non-retryable error), so it is opt-in.
+TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "mp3_44100_128")
+
+# The one encode of a session, in the compiled scene file
+FINAL_CODEC = os.getenv("FINAL_OUTPUT_CODEC", "mp3")
+FINAL_BITRATE = os.getenv("FINAL_OUTPUT_BITRATE", "192k")
+LOSSLESS_CODECS = {"wav", "flac"}
+
+# The mixer format: what pygame.mixer is initialised with, and what every turn,
+# SFX, music stem, mix and export stream is kept in. Defined only here.
+MIXER_FREQUENCY = 44100
+MIXER_SAMPLE_WIDTH = 2  # bytes (16-bit)
+MIXER_CHANNELS = 2
+
+# ElevenLabs PCM: signed 16-bit little-endian, mono
+PCM_SAMPLE_WIDTH = 2
+PCM_CHANNELS = 1
+
+# -------------------------------------------------------------
+# 2. FORMAT HELPERS
+
+def parse_output_format(output_format):
+    """'mp3_44100_128' -> ('mp3', 44100, 128); 'pcm_16000' -> ('pcm', 16000, None)."""
+    parts = output_format.split("_")
+    codec = parts[0]
+    sample_rate = int(parts[1]) if len(parts) > 1 else None
+    bitrate = int(parts[2]) if len(parts) > 2 else None
+    return codec, sample_rate, bitrate
+
+def is_pcm(output_format):
+    return parse_output_format(output_format)[0] == "pcm"
+
+def decode_audio(audio_bytes, output_format, frame_rate, channels, sample_width):
+    """
+    Turns convert() output into an AudioSegment in the given (mixer) format.
+    PCM is wrapped as-is (only upmixed/resampled if needed); anything else is
+    decoded through ffmpeg.
+    """
+    from pydub import AudioSegment
+
+    codec, sample_rate, _ = parse_output_format(output_format)
+    if codec == "pcm":
+        usable = len(audio_bytes) - len(audio_bytes) % PCM_SAMPLE_WIDTH
+        audio = AudioSegment(data=audio_bytes[:usable], sample_width=PCM_SAMPLE_WIDTH,
+                             frame_rate=sample_rate, channels=PCM_CHANNELS)
+    else:
+        audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=codec)
+
+    if audio.frame_rate != frame_rate:
+        audio = audio.set_frame_rate(frame_rate)
+    if audio.channels != channels:
+        audio = audio.set_channels(channels)
+    if audio.sample_width != sample_width:
+        audio = audio.set_sample_width(sample_width)
+    return audio
+
+def load_sound(audio_bytes, output_format):
+    """Builds a pygame Sound from convert() output, in the initialized mixer's format."""
+    import pygame
+
+    if not is_pcm(output_format):
+        return pygame.mixer.Sound(io.BytesIO(audio_bytes))
+    frequency, size, channels = pygame.mixer.get_init()
+    audio = decode_audio(audio_bytes, output_format, frequency, channels, abs(size) // 8)
+    return pygame.mixer.Sound(buffer=audio.raw_data)
+
+def export_options(codec=FINAL_CODEC, bitrate=FINAL_BITRATE):
+    """Keyword arguments for AudioSegment.export() (no bitrate for lossless codecs)."""
+    options = {"format": codec}
+    if bitrate and codec not in LOSSLESS_CODECS:
+        options["bitrate"] = bitrate
+    return options
@@ -1,38 +1,43 @@
-import pygame
-import io
 import time
-import os
-from dotenv import load_dotenv 
-from elevenlabs.client import ElevenLabs 
-from elevenlabs import Voice 
+from elevenlabs_client import get_client
+from synthesis_cache import SynthesisCache
+from audio_formats import TTS_OUTPUT_FORMAT, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH, MIXER_CHANNELS, load_sound
+from stream_player import stream_play, prefetch_chunks
+from sfx_cache import SfxCache
+from playback_worker import PlaybackWorker
+from pipeline_metrics import metrics
 # Import the data structures
 from audio_db import VOICE_ACTORS, MOOD_PRESETS, SOUND_EFFECTS 
 
 # -------------------------------------------------------------
 # 2. CONFIGURATION & INITIALIZATION
 
-load_dotenv() 
-API_KEY = os.getenv("ELEVENLABS_API_KEY") 
-
-if not API_KEY:
-    # Use a hardcoded test key if the env file fails, allowing the demo to run locally
-    print("⚠️ API_KEY not loaded from .env. Using fallback test mode.")
-    # You MUST replace this with your actual key if the .env file is not working!
-    API_KEY = "YOUR_ACTUAL_ELEVENLABS_API_KEY_HERE" 
-
 VOICE_ID = "JBFqnCBsd6RMkjVDRZzb" # Default voice ID
 MODEL_ID = "eleven_multilingual_v2" 
+STREAMING_PLAYBACK = True # Start playback while the API is still streaming
+
+# Persistent cache of rendered lines (keyed on voice, model, SSML and format)
+tts_cache = SynthesisCache()
+
+# Decoded sound effects, shared across turns (decode once, then only mix)
+sfx_cache = SfxCache()
+
+# Scene playback runs here, so the next prompt can start while this one is audible
+playback_worker = PlaybackWorker()
 
-# Initialize the ElevenLabs client
-client = ElevenLabs(api_key=API_KEY) 
+# Pygame is imported by initialize_audio_engine(), so importing this module stays cheap
+pygame = None
 
 def initialize_audio_engine():
-    """Initializes Pygame and its mixer for audio playback."""
+    """Imports and initializes Pygame and its mixer for audio playback."""
+    global pygame
+    import pygame
+
     try:
         pygame.init()
         # Set number of channels high enough to play dialogue and SFX concurrently (Source 2.4)
         pygame.mixer.set_num_channels(8) 
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        pygame.mixer.init(frequency=MIXER_FREQUENCY, size=-8 * MIXER_SAMPLE_WIDTH, channels=MIXER_CHANNELS, buffer=512)
         print("✅ Pygame Audio Mixer Initialized.")
         return True
     except pygame.error as e:
@@ -113,45 +118,85 @@ def get_user_selections():
 # -------------------------------------------------------------
 # 4. THE EXECUTIONER (API Call & Pygame)
 
-def generate_and_play_scene(final_text, voice_id, sfx_key):
-    """Generates speech and plays it concurrently with a sound effect."""
-    
+def start_sfx(sfx_key):
+    """Starts the sound effect for a scene and returns its channel (or None)."""
     sfx_path = SOUND_EFFECTS[sfx_key]['file_path']
     sfx_channel = None
 
-    # 1. Start the Sound Effect (Concurrent Playback)
     if sfx_path:
         try:
-            # Load SFX as a Pygame Sound object (different from mixer.music)
-            sfx_sound = pygame.mixer.Sound(sfx_path)
+            # Cached Pygame Sound object (decoded once, different from mixer.music)
+            with metrics.span("sfx_load"):
+                sfx_sound = sfx_cache.get_sound(sfx_key)
             # Play the SFX, Pygame handles which channel to use (Source 2.4)
             sfx_channel = sfx_sound.play() 
             print(f"🔊 Playing SFX: {sfx_key}...")
-        except pygame.error as e:
+        except Exception as e:
             print(f"⚠️ Warning: Could not load SFX file '{sfx_path}'. Ensure file exists in /assets: {e}")
-            
+    return sfx_channel
+
+def generate_and_play_scene(final_text, voice_id, sfx_key):
+    """
+    Generates speech and queues it, together with its sound effect, on the
+    playback worker. Returns without waiting for playback to finish.
+    """
+    
     print(f"🎙️ Generating dialogue...")
+    request_start = time.perf_counter()
     
-    # 2. ELEVENLABS GENERATION
+    # 1. ELEVENLABS GENERATION
     try:
-        audio_data_generator = client.text_to_speech.convert(
+        audio_data_generator = tts_cache.convert(
+            get_client(),
             text=final_text,
             voice_id=voice_id,
             model_id=MODEL_ID,
-            output_format="mp3_44100_128", 
+            output_format=TTS_OUTPUT_FORMAT, 
         )
-        audio_bytes = b"".join(audio_data_generator) 
-        print("✅ Audio data successfully received.")
+        if STREAMING_PLAYBACK:
+            # Start the request now; playback may still be busy with the previous scene
+            audio_data_generator = prefetch_chunks(audio_data_generator)
+        else:
+            with metrics.span("api"):
+                audio_bytes = b"".join(audio_data_generator) 
+            print("✅ Audio data successfully received.")
     
     except Exception as e:
         print(f"❌ Error during ElevenLabs generation. Check API Key/Network/Rate Limits: {e}")
         return
 
-    # 3. DIALOGUE PLAYBACK
-    audio_buffer = io.BytesIO(audio_bytes)
+    # 2. PLAYBACK JOB (SFX + dialogue, runs in order on the playback worker)
+    def playback_job():
+        # Start the Sound Effect (Concurrent Playback)
+        sfx_channel = start_sfx(sfx_key)
+
+        if STREAMING_PLAYBACK:
+            try:
+                print(f"▶️ Streaming Dialogue...")
+                with metrics.span("stream_playback"):
+                    time_to_first_sample = stream_play(audio_data_generator, input_format=TTS_OUTPUT_FORMAT,
+                                                       started_at=request_start)
+                if time_to_first_sample is not None:
+                    metrics.record("first_sample", time_to_first_sample)
+                    print(f"⏱️ Time to first sample: {time_to_first_sample:.2f}s")
+                print("⏹️ Dialogue playback complete.")
+            except Exception as e:
+                print(f"❌ Error during streamed generation/playback: {e}")
+        else:
+            with metrics.span("playback"):
+                play_dialogue_bytes(audio_bytes)
+            
+        # Stop the SFX if it's still running
+        if sfx_channel and sfx_channel.get_busy():
+            sfx_channel.stop()
+            print("⏹️ SFX stopped.")
+
+    playback_worker.submit(playback_job)
 
+def play_dialogue_bytes(audio_bytes):
+    """Buffered playback: loads the complete audio and waits for it to finish (playback thread)."""
     try:
-        dialogue_sound = pygame.mixer.Sound(audio_buffer)
+        dialogue_sound = load_sound(audio_bytes, TTS_OUTPUT_FORMAT)
         
         print(f"▶️ Playing Dialogue...")
         dialogue_channel = dialogue_sound.play()
@@ -164,11 +209,6 @@ def generate_and_play_scene(final_text, voice_id, sfx_key):
         
     except pygame.error as e:
         print(f"❌ Pygame Playback Error. Audio format may be incompatible: {e}")
-        
-    # 4. Stop the SFX if it's still running
-    if sfx_channel and sfx_channel.get_busy():
-        sfx_channel.stop()
-        print("⏹️ SFX stopped.")
 
 
 # -------------------------------------------------------------
@@ -197,6 +237,8 @@ if __name__ == "__main__":
         print(f"\n🎬 Staging scene: Voice='{voice_key}', Mood='{mood_key}', SFX='{sfx_key}'...")
         generate_and_play_scene(final_text, voice_id, sfx_key)
 
-    # Clean up Pygame resources and systems
+    # Let queued scenes finish, then clean up Pygame resources and systems
+    playback_worker.shutdown()
+    metrics.print_summary()
     pygame.quit()
     print("Engine shut down. Mission complete.")
@@ -1,36 +1,37 @@
-import pygame
 import io
 import time
-import os
-from dotenv import load_dotenv 
-from elevenlabs.client import ElevenLabs 
-from elevenlabs import Voice 
+from elevenlabs_client import get_client
+from synthesis_cache import SynthesisCache
+from sfx_cache import SfxCache
+from audio_formats import MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH, MIXER_CHANNELS
+from pipeline_metrics import metrics
 # Import the data structures
 from audio_db import VOICE_ACTORS, MOOD_PRESETS, SOUND_EFFECTS 
 
 # -------------------------------------------------------------
 # 2. CONFIGURATION & INITIALIZATION
 
-load_dotenv() 
-API_KEY = os.getenv("ELEVENLABS_API_KEY") 
-
-if not API_KEY:
-    # Fallback/Test Key for local development
-    print("⚠️ API_KEY not loaded from .env. Using hardcoded test mode.")
-    API_KEY = "YOUR_ACTUAL_ELEVENLABS_API_KEY_HERE" 
-
 MODEL_ID = "eleven_multilingual_v2" 
 FINAL_OUTPUT_FILE = "final_scene_audio.mp3" 
 
-# Initialize the ElevenLabs client
-client = ElevenLabs(api_key=API_KEY) 
+# Persistent cache of rendered lines (keyed on voice, model, SSML and format)
+tts_cache = SynthesisCache()
+
+# Decoded sound effects, shared across turns (decode once, then only mix)
+sfx_cache = SfxCache()
+
+# Pygame is imported by initialize_audio_engine(), so importing this module stays cheap
+pygame = None
 
 def initialize_audio_engine():
-    """Initializes Pygame and its mixer for audio playback."""
+    """Imports and initializes Pygame and its mixer for audio playback."""
+    global pygame
+    import pygame
+
     try:
         pygame.init()
         pygame.mixer.set_num_channels(8) 
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        pygame.mixer.init(frequency=MIXER_FREQUENCY, size=-8 * MIXER_SAMPLE_WIDTH, channels=MIXER_CHANNELS, buffer=512)
         print("✅ Pygame Audio Mixer Initialized.")
         return True
     except pygame.error as e:
@@ -124,12 +125,13 @@ def process_scene_turn(final_text, voice_key, sfx_key):
     # 1. Start the Sound Effect
     if sfx_path:
         try:
-            sfx_sound = pygame.mixer.Sound(sfx_path)
+            with metrics.span("sfx_load"):
+                sfx_sound = sfx_cache.get_sound(sfx_key)
             sfx_channel = sfx_sound.play() 
             print(f"🔊 Playing SFX: {sfx_key}...")
             # Wait a short time for SFX to start before processing dialogue
             time.sleep(0.5) 
-        except pygame.error as e:
+        except Exception as e:
             print(f"⚠️ Warning: Could not load SFX file '{sfx_path}'. Ensure file exists: {e}")
     
     # 2. DIALOGUE GENERATION (BYPASS LOGIC)
@@ -137,13 +139,15 @@ def process_scene_turn(final_text, voice_key, sfx_key):
         voice_id = VOICE_ACTORS[voice_key]['voice_id']
         print(f"🎙️ Generating dialogue for {voice_key}...")
         try:
-            audio_data_generator = client.text_to_speech.convert(
+            audio_data_generator = tts_cache.convert(
+                get_client(),
                 text=final_text,
                 voice_id=voice_id,
                 model_id=MODEL_ID,
                 output_format="mp3_44100_128", 
             )
-            dialogue_bytes = b"".join(audio_data_generator) 
+            with metrics.span("api"):
+                dialogue_bytes = b"".join(audio_data_generator) 
             print("✅ Dialogue audio generated.")
             
         except Exception as e:
@@ -153,13 +157,15 @@ def process_scene_turn(final_text, voice_key, sfx_key):
         if dialogue_bytes:
             audio_buffer = io.BytesIO(dialogue_bytes)
             try:
-                dialogue_sound = pygame.mixer.Sound(audio_buffer)
+                with metrics.span("decode"):
+                    dialogue_sound = pygame.mixer.Sound(audio_buffer)
                 print("▶️ Playing Dialogue...")
-                dialogue_channel = dialogue_sound.play()
-                
-                # Wait until the dialogue finishes playing
-                while dialogue_channel.get_busy():
-                    time.sleep(0.1)
+                with metrics.span("playback"):
+                    dialogue_channel = dialogue_sound.play()
+                    
+                    # Wait until the dialogue finishes playing
+                    while dialogue_channel.get_busy():
+                        time.sleep(0.1)
             except pygame.error as e:
                 print(f"❌ Pygame Playback Error: {e}")
     
@@ -229,13 +235,16 @@ if __name__ == "__main__":
         final_bytes = b"".join(all_scene_audio)
         
         # 2. Save the final file to disk
-        with open(FINAL_OUTPUT_FILE, "wb") as f:
-            f.write(final_bytes)
+        with metrics.span("export"):
+            with open(FINAL_OUTPUT_FILE, "wb") as f:
+                f.write(final_bytes)
         print(f"✅ Scene saved to: {FINAL_OUTPUT_FILE}")
         
         # 3. Play the complete scene back for review
         # (Playback logic is removed from final compilation for simplicity of this long script)
 
+    metrics.print_summary()
+
     # Clean up Pygame resources
     pygame.quit()
     print("Engine shut down. Mission complete.")
@@ -1,39 +1,91 @@
-import pygame
-import io
-import time
 import os
-from dotenv import load_dotenv 
-from elevenlabs.client import ElevenLabs 
-from elevenlabs import Voice 
-from pydub import AudioSegment # Crucial for timing and compilation
+import sys
+import csv
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 # Import the data structures (Requires: audio_db.py file)
 from audio_db import VOICE_ACTORS, MOOD_PRESETS, SOUND_EFFECTS 
+from elevenlabs_client import get_client, active_client
+from synthesis_cache import SynthesisCache, synthesis_key
+from audio_formats import (TTS_OUTPUT_FORMAT, FINAL_CODEC, FINAL_BITRATE, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH,
+                           MIXER_CHANNELS, decode_audio, export_options)
+from long_text import LONG_TEXT_MAX_CHARS, chunk_text, synthesize_chunks, stitch
+from scratch_store import ScratchStore
+from render_manifest import RenderManifest, content_hash
+from sfx_cache import SfxCache
+from asset_store import get_store
+from mp3_probe import get_index
+from music_library import MusicLibrary
+from playback_worker import PlaybackWorker
+from pipeline_metrics import metrics, profile_session
+from speculative import SpeculativeSynthesizer, UsageStats
 
 # -------------------------------------------------------------
 # 2. CONFIGURATION & INITIALIZATION
-
-load_dotenv() 
-API_KEY = os.getenv("ELEVENLABS_API_KEY") 
-
-if not API_KEY:
-    # Fallback/Test Key for local development (MUST BE REPLACED WITH YOUR KEY)
-    print("⚠️ API_KEY not loaded from .env. Using hardcoded test mode.")
-    API_KEY = "YOUR_ACTUAL_ELEVENLABS_API_KEY_HERE" 
+# The ElevenLabs SDK, pydub and pygame are imported on first use, so script
+# validation (and importing apply_mood_xml elsewhere) needs no API key.
 
 MODEL_ID = "eleven_multilingual_v2" 
+OUTPUT_FORMAT = TTS_OUTPUT_FORMAT # TTS_OUTPUT_FORMAT=pcm_44100 (Pro plans): nothing to decode, no extra lossy generation
 FINAL_OUTPUT_FILE = "final_scene_audio.mp3" 
 NONE_VOICE_KEY = "NONE (SFX Only)" # Constant for the bypass key
 SILENCE_VOICE_KEY = "SILENCE_MAKER" # Constant for utility voice
+DEFAULT_BATCH_WORKERS = 4 # Concurrent TTS requests in batch mode
+COMPILE_QUEUED_BLOCKS = 4 # Mixed blocks waiting for the encoder at compile (bounds memory)
+
+# Headless mode: no pygame import, no audio device, no review playback
+HEADLESS = os.getenv("AUTOMATOR_HEADLESS", "").lower() in ("1", "true", "yes")
+
+# Draft review: previews are mixed and played mono at a quarter of the rate
+# (the compiled scene is still rendered at full quality)
+DRAFT_REVIEW = os.getenv("AUTOMATOR_DRAFT_REVIEW", "").lower() in ("1", "true", "yes")
+DRAFT_FREQUENCY = 11025
+DRAFT_CHANNELS = 1
+DRAFT_FACTOR = MIXER_FREQUENCY // DRAFT_FREQUENCY
+
+# Speculative mode: the likeliest voice/mood picks are synthesized while the menus are open
+# (costs API characters for every wrong guess, so it is opt-in)
+SPECULATIVE = os.getenv("AUTOMATOR_SPECULATIVE", "").lower() in ("1", "true", "yes")
+
+# Rendered turns (mixer-format PCM) live in memory-mapped scratch files, not on the heap
+scratch_store = ScratchStore()
 
-# Initialize the ElevenLabs client
-client = ElevenLabs(api_key=API_KEY) 
+# Persistent cache of rendered lines (keyed on voice, model, SSML and format)
+tts_cache = SynthesisCache()
 
-def initialize_audio_engine():
-    """Initializes Pygame and its mixer for audio playback."""
+# Decoded sound effects, shared across turns (decode once, then only mix)
+sfx_cache = SfxCache()
+
+# Background scores for the compiled scene (--music), indexed from music_library.csv
+music_library = MusicLibrary()
+
+# Review playback runs here, so the next turn can start while this one is audible
+playback_worker = PlaybackWorker()
+
+# Pygame is imported by initialize_audio_engine(), so headless runs never load it
+pygame = None
+
+def initialize_audio_engine(draft=False):
+    """
+    Imports and initializes Pygame and its mixer for audio playback
+    (at the draft preview format if draft is set).
+    """
+    global pygame
     try:
+        import pygame
+    except ImportError as e:
+        print(f"❌ Pygame is not installed (use --headless to render without audio): {e}")
+        return False
+
+    frequency, channels = (DRAFT_FREQUENCY, DRAFT_CHANNELS) if draft else (MIXER_FREQUENCY, MIXER_CHANNELS)
+    try:
+        # pygame.init() opens the mixer too: set the format before it does
+        pygame.mixer.pre_init(frequency=frequency, size=-8 * MIXER_SAMPLE_WIDTH, channels=channels, buffer=512)
         pygame.init()
         pygame.mixer.set_num_channels(8) 
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        pygame.mixer.init(frequency=frequency, size=-8 * MIXER_SAMPLE_WIDTH, channels=channels, buffer=512)
         print("✅ Pygame Audio Mixer Initialized.")
         return True
     except pygame.error as e:
@@ -57,12 +109,31 @@ def apply_mood_xml(phrase, mood_key):
         
     return final_text
 
-def get_user_selections():
-    """Prompts the user for dialogue, voice actor, mood, and sound effect."""
+def index_sound_effects():
+    """
+    Hashes and probes every SFX file on a background thread (one save per
+    index at the end). The menu only reads what is indexed so far, so a large
+    library never slows the prompts down.
+    """
+    def build():
+        paths = [SOUND_EFFECTS[sfx_key]['file_path'] for sfx_key in SOUND_EFFECTS]
+        get_index().build([path for path in paths if path])
+
+    thread = threading.Thread(target=build, name="sfx-index", daemon=True)
+    thread.start()
+    return thread
+
+def get_user_selections(on_dialogue=None):
+    """
+    Prompts the user for dialogue, voice actor, mood, and sound effect.
+    on_dialogue(dialogue) is called as soon as the line is entered.
+    """
     
     dialogue = input("\n[1/3-4] Enter dialogue or action (or 'DONE'):\n> ").strip()
     if dialogue.upper() == 'DONE':
         return None, None, None, None
+    if on_dialogue:
+        on_dialogue(dialogue)
     
     # --- Voice Actor Selection (Includes NONE option) ---
     print("\n[2/3-4] Choose a Voice Actor (or NONE for SFX only):")
@@ -99,126 +170,593 @@ def get_user_selections():
     prompt_num = 3 if voice_key == NONE_VOICE_KEY else 4
     print(f"\n[{prompt_num}/4] Choose a Sound Effect:")
     sfx_keys = list(SOUND_EFFECTS.keys())
-    for i, sfx in enumerate(sfx_keys):
-        desc = SOUND_EFFECTS[sfx]['type']
-        print(f"{i + 1}. {sfx} ({desc})")
+    while True:
+        for i, sfx in enumerate(sfx_keys):
+            desc = SOUND_EFFECTS[sfx]['type']
+            sfx_path = SOUND_EFFECTS[sfx]['file_path']
+            metadata = get_index().cached(sfx_path) if sfx_path else None  # Indexed in the background
+            if metadata:
+                desc += f", {metadata['duration']:.1f}s"
+            print(f"{i + 1}. {sfx} ({desc})")
 
-    try:
-        sfx_choice = int(input("Enter choice (number): "))
-        sfx_key = sfx_keys[sfx_choice - 1]
-    except (ValueError, IndexError):
-        print("Invalid choice. Defaulting to NONE.")
-        sfx_key = "NONE"
+        sfx_choice = input("Enter choice (number), or tags to narrow the list (e.g. 'tense stealth'): ").strip()
+        if sfx_choice and not sfx_choice.isdigit():
+            # Tag query against the registry's inverted index, NONE always offered
+            matches = sorted(SOUND_EFFECTS.find(tags=sfx_choice.lower().split()) - {"NONE"})
+            if matches:
+                sfx_keys = ["NONE"] + matches
+                continue
+            print(f"No sound effect is tagged '{sfx_choice}'. Tags: {', '.join(SOUND_EFFECTS.field_values('tags'))}")
+            continue
+        try:
+            sfx_key = sfx_keys[int(sfx_choice) - 1]
+        except (ValueError, IndexError):
+            print("Invalid choice. Defaulting to NONE.")
+            sfx_key = "NONE"
+        break
 
     return dialogue, voice_key, mood_key, sfx_key
 
 # -------------------------------------------------------------
 # 4. THE EXECUTIONER (Scene Generation and Playback)
 
-def process_scene_turn(final_text, voice_key, sfx_key, turn_number):
+def turn_request(final_text, voice_key):
+    """Returns the (voice_id, text) sent to the API for a turn."""
+    if voice_key == NONE_VOICE_KEY:
+        # SILENCE GENERATION (Utility Voice)
+        return VOICE_ACTORS[SILENCE_VOICE_KEY]['voice_id'], "<speak><break time=\"1000ms\"/></speak>"
+    # DIALOGUE GENERATION (Chosen Actor)
+    return VOICE_ACTORS[voice_key]['voice_id'], final_text
+
+def synthesize_audio(api_text, voice_id, turn_number, chunk=None):
+    """One convert() call (through the cache), brought into the mixer format."""
+    labels = {"turn": turn_number} if chunk is None else {"turn": turn_number, "chunk": chunk}
+
+    # 1. ElevenLabs API Call (the request runs while the stream is consumed)
+    with metrics.span("api", **labels):
+        audio_data_generator = tts_cache.convert(
+            get_client(),
+            text=api_text,
+            voice_id=voice_id,
+            model_id=MODEL_ID,
+            output_format=OUTPUT_FORMAT, 
+        )
+        audio_bytes = b"".join(audio_data_generator)
+    
+    # 2. Into an AudioSegment in the mixer format (PCM is only upmixed, MP3 is decoded)
+    with metrics.span("decode", **labels):
+        return decode_audio(audio_bytes, OUTPUT_FORMAT, MIXER_FREQUENCY,
+                            MIXER_CHANNELS, MIXER_SAMPLE_WIDTH)
+
+def synthesize_text(api_text, voice_id, turn_number):
+    """
+    Synthesizes a line of any length. Long narration is split at sentence
+    boundaries (mood wrappers kept on every chunk), the chunks are rendered
+    concurrently and stitched back in order with short crossfades.
+    """
+    chunks = chunk_text(api_text)
+    if len(chunks) == 1:
+        return synthesize_audio(api_text, voice_id, turn_number)
+
+    print(f"📜 Long text: synthesizing {len(chunks)} chunks in parallel...")
+    segments = synthesize_chunks(
+        chunks, lambda index, chunk: synthesize_audio(chunk, voice_id, turn_number, chunk=index + 1)
+    )
+    with metrics.span("stitch", turn=turn_number):
+        return stitch(segments)
+
+def prefetch_turn(dialogue, voice_key, mood_key, cancelled):
     """
-    Generates dialogue/silence, mixes the SFX into the audio segment, 
-    and saves the combined result to a temp file.
-    Returns the path to the saved temporary file.
+    Speculative synthesis of a line for a guessed voice/mood: the request the
+    turn would make is streamed into the synthesis cache, so process_scene_turn()
+    finds it there. Stops (and stores nothing) once `cancelled` is set.
+    """
+    voice_id, api_text = turn_request(apply_mood_xml(dialogue, mood_key), voice_key)
+
+    def prefetch_chunk(index, chunk):
+        if cancelled.is_set():
+            return False
+        stream = tts_cache.convert(get_client(), text=chunk, voice_id=voice_id,
+                                   model_id=MODEL_ID, output_format=OUTPUT_FORMAT)
+        for _ in stream:
+            if cancelled.is_set():
+                stream.close()  # Unfinished: never written to the cache
+                return False
+        return True
+
+    # Long lines are prefetched chunk by chunk in parallel, as synthesize_text() renders them
+    return all(synthesize_chunks(chunk_text(api_text), prefetch_chunk))
+
+def speculation_allowed(voice_key, mood_key):
+    """Past picks that can still be prefetched (SFX-only turns have no line to synthesize)."""
+    return voice_key != NONE_VOICE_KEY and voice_key in VOICE_ACTORS and mood_key in MOOD_PRESETS
+
+def process_scene_turn(final_text, voice_key, sfx_key, turn_number, review=True, draft=False):
+    """
+    Generates dialogue/silence for a turn. The turn's PCM (mixer format) is
+    kept in the scratch store next to its SFX key; mixing and the final
+    encode happen once for the whole scene, in compile_scene().
+    Set review=False to skip the playback step (batch rendering), and
+    draft=True to review a cheap mono, reduced-rate mix (see draft_preview()).
+    Returns the turn dict ({"turn", "dialogue", "sfx_key"}), or None on failure.
     """
     
-    sfx_path = SOUND_EFFECTS[sfx_key]['file_path']
-    temp_file_path = f"temp_turn_{turn_number}.mp3"
     current_audio = None
     
     # --- Generation of Dialogue/Silence Segment ---
+    voice_id, api_text = turn_request(final_text, voice_key)
     if voice_key == NONE_VOICE_KEY:
-        # SILENCE GENERATION (Utility Voice)
-        voice_id = VOICE_ACTORS[SILENCE_VOICE_KEY]['voice_id'] 
         print("🎙️ Generating 1-second silence via API...")
-        api_text = "<speak><break time=\"1000ms\"/></speak>" 
     else:
-        # DIALOGUE GENERATION (Chosen Actor)
-        voice_id = VOICE_ACTORS[voice_key]['voice_id']
         print(f"🎙️ Generating dialogue for {voice_key}...")
-        api_text = final_text 
 
     try:
-        # 1. ElevenLabs API Call
-        audio_data_generator = client.text_to_speech.convert(
-            text=api_text,
-            voice_id=voice_id,
-            model_id=MODEL_ID,
-            output_format="mp3_44100_128", 
-        )
-        
-        # 2. Convert raw bytes to AudioSegment for mixing
-        audio_bytes = b"".join(audio_data_generator)
-        current_audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3")
+        # 1-2. ElevenLabs API call(s) and decode (long text is split and stitched)
+        current_audio = synthesize_text(api_text, voice_id, turn_number)
         print("✅ Audio segment generated.")
         
     except Exception as e:
         print(f"❌ Error during ElevenLabs generation: {e}")
         return None 
 
-    # --- 3. SFX Mixing (Overlaying SFX onto the Dialogue/Silence Segment) ---
+    turn = {"turn": turn_number, "dialogue": scratch_pcm(current_audio.raw_data), "sfx_key": sfx_key}
+
+    # --- 3. SFX: decode now (cached), so compile_scene() only mixes ---
+    sfx_path = SOUND_EFFECTS[sfx_key]['file_path']
     if sfx_path and os.path.exists(sfx_path):
         try:
-            sfx_audio = AudioSegment.from_file(sfx_path)
-            
-            # Adjust dialogue/silence volume slightly for SFX to be prominent
-            dialogue_volume_adjusted = current_audio - 3.0 
-            
-            # Overlay the SFX onto the segment (SFX starts at position 0ms)
-            mixed_audio = dialogue_volume_adjusted.overlay(sfx_audio, position=0)
-            current_audio = mixed_audio
-            print(f"🔊 SFX '{sfx_key}' mixed into segment.")
-            
+            with metrics.span("sfx_load", turn=turn_number):
+                sfx_cache.get_segment(sfx_key)
         except Exception as e:
-            print(f"⚠️ Warning: Failed to mix SFX '{sfx_key}'. Check file format: {e}")
+            print(f"⚠️ Warning: Failed to load SFX '{sfx_key}'. Check file format: {e}")
             
-    # --- 4. Save and Playback (FIXED DURATION CHECK) ---
-    
-    # Save the final mixed/silent segment to a temporary file
-    current_audio.export(temp_file_path, format="mp3")
-    print(f"✅ Segment saved to {temp_file_path}.")
-
-    # Play the mixed segment immediately for review
-    if os.path.exists(temp_file_path):
-        # 1. Load the generated audio segment again to measure its length
-        playback_segment = AudioSegment.from_mp3(temp_file_path)
-        playback_duration_seconds = playback_segment.duration_seconds
+    print(f"✅ Turn {turn_number} segment ready ({current_audio.duration_seconds:.1f}s).")
+
+    # Queue the mixed turn for review (non-blocking)
+    if review:
+        # 1. Mix just this turn (dialogue + SFX): draft mixer, or the scene mixer
+        with metrics.span("review_mix", turn=turn_number):
+            if draft:
+                preview_pcm = draft_preview(turn)
+                preview_seconds = len(preview_pcm) / DRAFT_FREQUENCY
+            else:
+                preview = build_timeline([turn]).render_segment()
+                preview_pcm, preview_seconds = preview.raw_data, preview.duration_seconds
         
-        # 2. Pygame loads the sound
-        review_sound = pygame.mixer.Sound(temp_file_path)
-        print(f"▶️ Playing Segment ({playback_duration_seconds:.1f}s)...")
-        review_channel = review_sound.play()
+        # 2. Pygame plays the raw samples directly (same format as the mixer)
+        with metrics.span("review_load", turn=turn_number):
+            review_sound = pygame.mixer.Sound(buffer=preview_pcm)
+        print(f"▶️ Playing Segment ({preview_seconds:.1f}s{', draft' if draft else ''})...")
         
-        # 3. Wait for the PRECISE DURATION plus a small buffer (The FIX)
-        time.sleep(playback_duration_seconds + 0.5) 
+        # 3. The playback worker plays it in turn order while the next prompt runs
+        playback_worker.submit_sound(review_sound)
+
+    return turn
+
+def draft_preview(turn):
+    """
+    Review mix of one turn in the draft format (DRAFT_FREQUENCY, mono):
+    dialogue and SFX are averaged down before mixing, so the mix touches a
+    fraction of the samples and nothing is resampled or encoded.
+    Returns int16 PCM for a mixer opened with initialize_audio_engine(draft=True).
+    """
+    from numpy_mixer import array_to_int16, downmix_decimate, mix_draft
+
+    sfx = None
+    sfx_key = turn["sfx_key"]
+    sfx_path = SOUND_EFFECTS[sfx_key]['file_path']
+    if sfx_path and os.path.exists(sfx_path):
+        try:
+            sfx = sfx_cache.get_draft(sfx_key, DRAFT_FACTOR)
+        except Exception as e:
+            print(f"⚠️ Warning: Failed to mix SFX '{sfx_key}'. Check file format: {e}")
+    tracks = [(downmix_decimate(turn["dialogue"], DRAFT_FACTOR), -3.0 if sfx is not None else 0.0)]
+    if sfx is not None:
+        tracks.append((sfx, 0.0))
+    return array_to_int16(mix_draft(tracks))
+
+# -------------------------------------------------------------
+# 5. BATCH MODE (Non-interactive Scene Script Rendering)
+
+def load_scene_script(script_path):
+    """
+    Loads a scene script: a list of (dialogue, voice_key, mood_key, sfx_key)
+    turns, matching the tuple returned by get_user_selections().
+    Accepts a JSON list (of lists or of objects) or a CSV with those columns.
+    """
+    fields = ("dialogue", "voice_key", "mood_key", "sfx_key")
+    with open(script_path, newline="", encoding="utf-8") as f:
+        if script_path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+
+    script = []
+    for i, row in enumerate(rows, start=1):
+        if isinstance(row, dict):
+            row = [row.get(field) for field in fields]
+        dialogue, voice_key, mood_key, sfx_key = (list(row) + [None] * 4)[:4]
+        mood_key = mood_key or "NONE"
+        sfx_key = sfx_key or "NONE"
+
+        if voice_key not in VOICE_ACTORS:
+            raise ValueError(f"Turn {i}: unknown voice actor '{voice_key}'.")
+        if mood_key not in MOOD_PRESETS:
+            raise ValueError(f"Turn {i}: unknown mood '{mood_key}'.")
+        if sfx_key not in SOUND_EFFECTS:
+            raise ValueError(f"Turn {i}: unknown sound effect '{sfx_key}'.")
+        if voice_key != NONE_VOICE_KEY and not (dialogue or "").strip():
+            raise ValueError(f"Turn {i}: no dialogue for voice actor '{voice_key}'.")
+
+        script.append((dialogue or "", voice_key, mood_key, sfx_key))
+    return script
+
+def validate_scene_script(script):
+    """
+    Dry run of a loaded scene script: reports how many turns and characters
+    would be sent to the API, given what is already in the synthesis cache.
+    Builds no client and imports no audio libraries.
+    """
+    pending_turns = 0
+    pending_characters = 0
+    for dialogue, voice_key, mood_key, sfx_key in script:
+        final_text = apply_mood_xml(dialogue, mood_key) if voice_key != NONE_VOICE_KEY else dialogue
+        voice_id, api_text = turn_request(final_text, voice_key)
+        # Long lines are requested (and cached) chunk by chunk
+        pending = [chunk for chunk in chunk_text(api_text)
+                   if not tts_cache.contains(synthesis_key(voice_id, MODEL_ID, chunk, OUTPUT_FORMAT))]
+        if pending:
+            pending_turns += 1
+            pending_characters += sum(len(chunk) for chunk in pending)
+
+    print(f"✅ Script OK: {len(script)} turns, {pending_turns} to synthesize "
+          f"({pending_characters} characters), {len(script) - pending_turns} cached.")
+    return pending_turns, pending_characters
+
+def turn_hash(scene_turn):
+    """Content hash of everything a rendered turn depends on (script row + engine settings)."""
+    dialogue, voice_key, mood_key, sfx_key = scene_turn
+    return content_hash({
+        "dialogue": dialogue,
+        "voice_key": voice_key,
+        "voice_id": VOICE_ACTORS[voice_key]['voice_id'],
+        "mood_key": mood_key,
+        "mood_template": MOOD_PRESETS[mood_key]['xml_template'],
+        "sfx_key": sfx_key,
+        "model_id": MODEL_ID,
+        "output_format": OUTPUT_FORMAT,
+        "long_text_max_chars": LONG_TEXT_MAX_CHARS,
+        "mixer": [MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH, MIXER_CHANNELS],
+    })
+
+def asset_digest(path):
+    """Content hash of an SFX/music file (None if there is none); re-hashed only when the file changes."""
+    return get_store().digest(path) if path else None
+
+def scene_hash(turn_hashes, music=None, codec=FINAL_CODEC, bitrate=FINAL_BITRATE, sfx_keys=()):
+    """
+    Content hash of a whole compiled scene. Covers the content of the SFX
+    and music files too, so replacing one re-compiles the scene (the
+    dialogue turns, hashed without them, are still reused).
+    """
+    music_track = music_library.by_name(music) if music else None
+    return content_hash({
+        "turns": turn_hashes,
+        "music": music,
+        "music_asset": asset_digest(music_track["path"]) if music_track else None,
+        "sfx_assets": {sfx_key: asset_digest(SOUND_EFFECTS[sfx_key]['file_path'])
+                       for sfx_key in sorted(set(sfx_keys))},
+        "export": export_options(codec, bitrate),
+    })
+
+def scratch_pcm(pcm):
+    """
+    Moves a turn's mixer-format PCM into the scratch store. Returns a
+    zero-copy int16 (frames, MIXER_CHANNELS) view the timeline mixes from.
+    """
+    import numpy as np
+
+    segment_id = scratch_store.append(pcm)
+    return np.frombuffer(scratch_store.view(segment_id), dtype=np.int16).reshape(-1, MIXER_CHANNELS)
+
+def render_scene_script(script, max_workers=DEFAULT_BATCH_WORKERS, manifest=None):
+    """
+    Renders every turn of a scene script through a bounded thread pool.
+    With a RenderManifest, turns whose inputs are unchanged since the last
+    render are loaded from disk and only the edited ones are synthesized.
+    Returns the rendered turns in turn order. A failed turn is left out:
+    callers compare the turn numbers against the script.
+    """
+    def render_turn(numbered_turn):
+        turn_number, (dialogue, voice_key, mood_key, sfx_key) = numbered_turn
+        turn_key = turn_hash((dialogue, voice_key, mood_key, sfx_key)) if manifest else None
+        if manifest:
+            pcm = manifest.load_turn(turn_key)
+            if pcm is not None:
+                print(f"♻️ [Turn {turn_number}] Unchanged, reusing the rendered audio.")
+                return {"turn": turn_number, "dialogue": scratch_pcm(pcm), "sfx_key": sfx_key}
+
+        if voice_key != NONE_VOICE_KEY:
+            final_text = apply_mood_xml(dialogue, mood_key)
+        else:
+            final_text = dialogue
+        print(f"🎬 [Turn {turn_number}] Voice='{voice_key}', Mood='{mood_key}', SFX='{sfx_key}'...")
+        turn = process_scene_turn(final_text, voice_key, sfx_key, turn_number, review=False)
+        if manifest and turn is not None:
+            manifest.store_turn(turn_key, turn["dialogue"])
+        return turn
+
+    # executor.map yields results in submission order, whatever order they finish in
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(render_turn, enumerate(script, start=1)))
+
+    return [turn for turn in results if turn is not None]
+
+# -------------------------------------------------------------
+# 6. FINAL COMPILATION
+
+def turn_layers(turn):
+    """A turn's SFX layers (at the turn start) and its dialogue gain (3 dB down under SFX)."""
+    from numpy_mixer import make_layer
+
+    sfx_layers = []
+    sfx_key = turn["sfx_key"]
+    sfx_path = SOUND_EFFECTS[sfx_key]['file_path']
+    if sfx_path and os.path.exists(sfx_path):
+        try:
+            sfx_layers.append(make_layer(sfx_cache.get_array(sfx_key), offset_ms=0))  # Shared int16 view
+        except Exception as e:
+            print(f"⚠️ Warning: Failed to mix SFX '{sfx_key}'. Check file format: {e}")
+    return sfx_layers, -3.0 if sfx_layers else 0.0
+
+def build_timeline(turns, music=None):
+    """
+    Lays the turns out end to end on a SceneTimeline, with each turn's SFX
+    at its start (dialogue 3 dB down under it) and, optionally, a music bed
+    from music_library.csv ducked under the dialogue.
+    """
+    from timeline_renderer import SceneTimeline
+
+    timeline = SceneTimeline()
+    for turn in turns:
+        sfx_layers, dialogue_gain_db = turn_layers(turn)
+        timeline.add_turn(turn["dialogue"], sfx=sfx_layers, dialogue_gain_db=dialogue_gain_db)
+
+    if music:
+        stem = music_library.get_stem(music)
+        if stem:
+            timeline.set_music(stem)
+        else:
+            print(f"⚠️ Warning: Music track '{music}' not found, compiling without a score.")
+    return timeline
+
+def compile_scene(all_turns, output_file=FINAL_OUTPUT_FILE, music=None,
+                  codec=FINAL_CODEC, bitrate=FINAL_BITRATE):
+    """
+    Renders the whole scene timeline in one pass and encodes it once. The
+    mix is streamed into the encoder block by block, straight from the
+    scratch-store turns, so memory stays flat however long the scene is.
+    Returns True on success.
+    """
+    from numpy_mixer import array_to_int16
+    from progressive_export import ProgressiveExporter
+
+    print("\n\n*** COMPILING FINAL SCENE ***")
+    
+    exporter = ProgressiveExporter(output_file, codec, bitrate, max_queued=COMPILE_QUEUED_BLOCKS)
+    try:
+        # 1-2. Mix every turn, its SFX and the music bed in a single pass, into the encoder
+        with metrics.span("mix"):
+            for block in build_timeline(all_turns, music).render_blocks():
+                exporter.append(array_to_int16(block))
         
-        # 4. Ensure playback stops before proceeding
-        review_channel.stop()
+        # 3. Finish the file (the only lossy encode of the session)
+        with metrics.span("export"):
+            exported = exporter.finalize()
+    except Exception as e:
+        exporter.abort()
+        print(f"❌ Failed to compile the final audio. Error: {e}")
+        print("Note: Ensure FFmpeg is installed.")
+        return False
 
-    return temp_file_path
+    if not exported:
+        print(f"❌ Failed to compile the final audio: the encoder could not write {output_file}.")
+        return False
+    print(f"✅ Full scene compiled and saved to: {output_file}")
+    return True
+
+def export_turn(progressive, turn):
+    """
+    Mixes a finished turn onto the progressive export (the encoder runs in
+    the background). Returns False if the encoder could not be started.
+    """
+    sfx_layers, dialogue_gain_db = turn_layers(turn)
+    try:
+        with metrics.span("progressive_mix", turn=turn["turn"]):
+            progressive.add_turn(turn["dialogue"], sfx=sfx_layers, dialogue_gain_db=dialogue_gain_db)
+    except OSError as e:
+        print(f"⚠️ Warning: Progressive export unavailable ({e}); the scene will be compiled at the end.")
+        return False
+    return True
+
+def finish_progressive_export(progressive, all_turns, output_file, codec=FINAL_CODEC, bitrate=FINAL_BITRATE):
+    """Closes the encoder stream; falls back to a full compile if it failed. Returns True on success."""
+    print("\n\n*** FINALIZING SCENE ***")
+    with metrics.span("export"):
+        finalized = progressive.finalize()
+    if finalized:
+        print(f"✅ Full scene compiled and saved to: {output_file}")
+        return True
+    print("⚠️ Warning: The progressive export failed, compiling the scene in one pass instead.")
+    return compile_scene(all_turns, output_file, codec=codec, bitrate=bitrate)
 
 # -------------------------------------------------------------
-# 5. THE MAIN ENGINE LOOP (Dialogue Construction Loop)
+# 7. THE MAIN ENGINE LOOP (Dialogue Construction Loop)
 
-if __name__ == "__main__":
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mythic Audio Automator v3")
+    parser.add_argument("--batch", metavar="SCRIPT",
+                        help="Render a scene script (JSON or CSV) without prompting.")
+    parser.add_argument("--validate", action="store_true",
+                        help="With --batch: check the script and report pending API work, then exit.")
+    parser.add_argument("--full", action="store_true",
+                        help="With --batch: ignore the render manifest and re-render every turn.")
+    parser.add_argument("--allow-partial", action="store_true",
+                        help="Batch mode: compile the scene even if some turns failed (by default nothing is exported).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BATCH_WORKERS,
+                        help="Concurrent TTS requests in batch mode. The API client still caps requests at "
+                             "ELEVENLABS_MAX_CONCURRENT_REQUESTS (default 4) in flight and "
+                             "ELEVENLABS_REQUESTS_PER_SECOND (default 5); raise those to your plan's limits.")
+    parser.add_argument("--output", default=FINAL_OUTPUT_FILE,
+                        help="Path of the compiled scene file.")
+    parser.add_argument("--codec", default=FINAL_CODEC,
+                        help="Codec of the compiled scene file (mp3, ogg, flac, wav...).")
+    parser.add_argument("--bitrate", default=FINAL_BITRATE,
+                        help="Bitrate of the compiled scene file (ignored for lossless codecs).")
+    parser.add_argument("--music", metavar="SCENE_NAME",
+                        choices=[track["scene_name"] for track in music_library.tracks],
+                        help="Score from music_library.csv to run under the scene (ducked under dialogue).")
+    parser.add_argument("--draft-review", action="store_true", default=DRAFT_REVIEW,
+                        help="Review turns as quick mono, low-rate drafts (the final scene stays full quality).")
+    parser.add_argument("--speculative", action="store_true", default=SPECULATIVE,
+                        help="Synthesize the likeliest voice/mood picks while the menus are open "
+                             "(interactive mode; wrong guesses still use API characters).")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="No audio device: skip pygame and review playback.")
+    parser.add_argument("--metrics-jsonl", metavar="PATH",
+                        help="Append every timing span to PATH as JSON lines.")
+    parser.add_argument("--metrics-prom", metavar="PATH",
+                        help="Write a Prometheus-style snapshot of the stage timings to PATH.")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Run the whole session under cProfile and save the stats to PATH.")
+    args = parser.parse_args()
+    if args.validate and not args.batch:
+        parser.error("--validate requires --batch SCRIPT")
+    return args
+
+def write_metrics(args):
+    """Prints the per-stage timing summary and writes the requested dumps."""
+    metrics.print_summary()
+    if args.metrics_jsonl:
+        metrics.dump_jsonl(args.metrics_jsonl)
+    if args.metrics_prom:
+        with open(args.metrics_prom, "w", encoding="utf-8") as f:
+            f.write(metrics.prometheus_text())
+
+def print_api_usage():
+    """Prints request/retry counts and characters used against the quota."""
+    client = active_client()
+    usage = client.scheduler.stats() if hasattr(client, "scheduler") else None
+    if not usage:
+        return
+    line = (f"📊 API usage: {usage['requests']} requests, {usage['retries']} retries "
+            f"({usage['throttled']} rate-limited), {usage['characters_used']} characters")
+    if "characters_remaining" in usage:
+        line += f", {usage['characters_remaining']:.0f} left in quota"
+    print(line + ".")
+
+def request_concurrency_limit():
+    """Concurrent requests the API client allows (None if it does not limit them)."""
+    client = active_client()
+    if client is None:
+        from request_scheduler import MAX_CONCURRENT_REQUESTS  # What get_client() will build
+        return MAX_CONCURRENT_REQUESTS or None
+    scheduler = getattr(client, "scheduler", None)
+    return scheduler.max_concurrent if scheduler else None
+
+def run_session(args):
+    """
+    Runs one batch render or interactive session. Returns the process exit
+    status: non-zero when a batch render failed or dropped turns.
+    """
+    if args.batch:
+        # Batch mode never plays audio, so the mixer is not needed
+        scene_script = load_scene_script(args.batch)
+        if args.validate:
+            validate_scene_script(scene_script)
+            return
+        # Incremental build: only turns edited since the last render are synthesized
+        manifest = None if args.full else RenderManifest.for_output(args.output)
+        turn_hashes = [turn_hash(scene_turn) for scene_turn in scene_script]
+        current_scene = scene_hash(turn_hashes, args.music, args.codec, args.bitrate,
+                                   sfx_keys=[scene_turn[3] for scene_turn in scene_script])
+        if manifest and manifest.is_current(current_scene, args.output):
+            print(f"✅ Scene unchanged since the last render: {args.output} is up to date.")
+            return
+
+        print(f"\n--- Batch rendering {len(scene_script)} turns ({args.workers} workers) ---")
+        limit = request_concurrency_limit()
+        if limit and args.workers > limit:
+            print(f"⚠️ Warning: --workers {args.workers} is above the client's limit of {limit} concurrent "
+                  f"requests (ELEVENLABS_MAX_CONCURRENT_REQUESTS); only {limit} will run at once.")
+        if args.music:
+            music_library.prewarm([args.music])  # Decode the score while the API calls run
+        batch_turns = render_scene_script(scene_script, max_workers=args.workers, manifest=manifest)
+        rendered = {turn["turn"] for turn in batch_turns}
+        failed = [number for number in range(1, len(scene_script) + 1) if number not in rendered]
+        if failed:
+            print(f"❌ {len(failed)} of {len(scene_script)} turns failed: {', '.join(map(str, failed))}.")
+        if failed and not args.allow_partial:
+            # A scene with missing lines is not a finished scene
+            print(f"❌ Nothing exported: {args.output} was left as it was (use --allow-partial "
+                  f"to compile the remaining turns anyway).")
+            compiled = False
+        else:
+            compiled = bool(batch_turns) and compile_scene(batch_turns, args.output, music=args.music,
+                                                         codec=args.codec, bitrate=args.bitrate)
+        if manifest:
+            print(f"♻️ Incremental render: {manifest.reused} turns reused, {manifest.rendered} rendered.")
+            # Only a complete scene is recorded, so failed turns are retried next time
+            if compiled and len(batch_turns) == len(scene_script):
+                manifest.record(turn_hashes, current_scene, args.output)
+        cache_stats = tts_cache.stats()
+        print(f"💾 Synthesis cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
+        print_api_usage()
+        return 0 if compiled else 1
     
-    if not initialize_audio_engine():
-        exit()
+    if args.headless:
+        print("🖥️ Headless mode: review playback disabled, rendering straight to file.")
+    elif not initialize_audio_engine(draft=args.draft_review):
+        return
         
     print("\n--- Mythic Audio Automator v3: Custom Dialogue Engine ---")
+    index_sound_effects()  # SFX durations for the menu, off the prompt path
     
-    all_temp_files = [] # List to hold paths to temp files
+    all_turns = [] # Decoded PCM dialogue + SFX key, one per turn
     turn_counter = 1
+
+    # Progressive export: every finished turn is mixed and encoded straight away,
+    # so DONE only flushes the encoder. The ducked music bed needs the whole
+    # scene (look-ahead, fade-out), so with --music the scene is compiled at DONE.
+    progressive = None
+    if not args.music:
+        from progressive_export import ProgressiveScene
+        progressive = ProgressiveScene(args.output, args.codec, args.bitrate)
+
+    # Speculative mode: candidates ranked by recent picks (none until there is a history)
+    usage = speculator = on_dialogue = None
+    if args.speculative:
+        usage = UsageStats()
+        speculator = SpeculativeSynthesizer(prefetch_turn)
+        on_dialogue = lambda dialogue: speculator.start(dialogue, usage.rank(allowed=speculation_allowed))
     
     while True:
         print(f"\n--- TURN {turn_counter} ---")
         
         # Get all required input
-        dialogue, voice_key, mood_key, sfx_key = get_user_selections()
+        dialogue, voice_key, mood_key, sfx_key = get_user_selections(on_dialogue)
         
         if dialogue is None:
             break
 
+        if speculator and voice_key == NONE_VOICE_KEY:
+            speculator.cancel_all()  # SFX-only turn: nothing was speculated for it
+        elif speculator:
+            # Wait for a matching prefetch (usually done by now), cancel the rest
+            if speculator.resolve(voice_key, mood_key):
+                print("⚡ Speculative synthesis: this line was already rendered.")
+            usage.record(voice_key, mood_key)
+
         # 1. Construct final text 
         if voice_key != NONE_VOICE_KEY:
             final_text = apply_mood_xml(dialogue, mood_key)
@@ -227,42 +765,51 @@ if __name__ == "__main__":
 
         # 2. Execute the scene turn
         print(f"🎬 Staging turn: Voice='{voice_key}', Mood='{mood_key}', SFX='{sfx_key}'...")
-        turn_file_path = process_scene_turn(final_text, voice_key, sfx_key, turn_counter)
+        turn = process_scene_turn(final_text, voice_key, sfx_key, turn_counter,
+                                  review=not args.headless, draft=args.draft_review)
         
-        # 3. Save file path and advance turn
-        if turn_file_path and os.path.exists(turn_file_path):
-            all_temp_files.append(turn_file_path)
+        # 3. Keep the turn and advance
+        if turn is not None:
+            all_turns.append(turn)
+            if progressive and not export_turn(progressive, turn):
+                progressive = None
         
         turn_counter += 1
 
     # --- Final Audio Compilation and Playback ---
-    if all_temp_files:
-        print("\n\n*** COMPILING FINAL SCENE with pydub ***")
-        
-        try:
-            # 1. Load the first segment
-            final_audio = AudioSegment.from_mp3(all_temp_files[0])
-            
-            # 2. Concatenate the remaining segments using pydub
-            for path in all_temp_files[1:]:
-                segment = AudioSegment.from_mp3(path)
-                final_audio += segment
-            
-            # 3. Export the final file
-            final_audio.export(FINAL_OUTPUT_FILE, format="mp3")
-            print(f"✅ Full scene compiled and saved to: {FINAL_OUTPUT_FILE}")
-            
-        except Exception as e:
-            print(f"❌ Failed to compile final audio using pydub. Error: {e}")
-            print("Note: Ensure all temp files are valid MP3s and FFmpeg is installed.")
-            
-        # 4. Clean up temporary files (Crucial for a clean system)
-        for path in all_temp_files:
-            try:
-                os.remove(path)
-            except OSError as e:
-                print(f"Could not remove temp file {path}: {e}")
-
-    # Clean up Pygame resources
-    pygame.quit()
+    if progressive and all_turns:
+        finish_progressive_export(progressive, all_turns, args.output, codec=args.codec, bitrate=args.bitrate)
+    elif progressive:
+        progressive.abort()  # Nothing was rendered: leave no empty file behind
+    elif all_turns:
+        compile_scene(all_turns, args.output, music=args.music, codec=args.codec, bitrate=args.bitrate)
+
+    cache_stats = tts_cache.stats()
+    print(f"💾 Synthesis cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
+    if speculator:
+        speculator.shutdown()
+        spec_stats = speculator.stats()
+        print(f"⚡ Speculative synthesis: {spec_stats['hits']} hits, {spec_stats['misses']} misses, "
+              f"{spec_stats['cancelled']} cancelled before starting.")
+    print_api_usage()
+
+    # Let the last review finish, then clean up Pygame resources
+    playback_worker.shutdown()
+    if pygame is not None:
+        pygame.quit()
     print("Engine shut down. Mission complete.")
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    try:
+        if args.profile:
+            with profile_session(args.profile):
+                status = run_session(args)
+        else:
+            status = run_session(args)
+    finally:
+        scratch_store.close()  # Also on Ctrl+C or a crash
+
+    write_metrics(args)
+    sys.exit(status)
@@ -0,0 +1,99 @@
+# bench_compile.py
+#
+# Compares the old `final_audio += segment` compile loop with the compile
+# V4 runs today (turns laid out on a timeline_renderer.SceneTimeline from
+# their int16 PCM, mixed block by block into int16 for the encoder) at
+# growing scene sizes. A second timeline run puts one shared SFX under every
+# turn, as turn_layers() does, and checks that peak memory stays flat.
+# Usage: python bench_compile.py [--turn-ms 250] [--sfx-ms 5000] [--turns 10 100 1000]
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from pydub.generators import Sine
+from audio_formats import MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH
+from numpy_mixer import array_to_int16, make_layer
+from timeline_renderer import SceneTimeline
+
+FLAT_MEMORY_GROWTH = 2.0  # Largest/smallest peak allowed across --turns
+
+# -------------------------------------------------------------
+# 1. THE TWO COMPILERS
+
+def compile_incremental(segments):
+    """The original V4 compile loop (quadratic copying)."""
+    final_audio = segments[0]
+    for segment in segments[1:]:
+        final_audio += segment
+    return final_audio
+
+def compile_timeline(turns, sfx=None):
+    """
+    What compile_scene() does, minus the encoder: each mixed block is handed
+    on and dropped. With sfx (an int16 array), every turn gets it as a layer.
+    """
+    timeline = SceneTimeline()
+    for dialogue in turns:
+        if sfx is None:
+            timeline.add_turn(dialogue)
+        else:
+            timeline.add_turn(dialogue, sfx=[make_layer(sfx)], dialogue_gain_db=-3.0)
+    frames = 0
+    for block in timeline.render_blocks():
+        frames += len(array_to_int16(block))
+    return frames
+
+# -------------------------------------------------------------
+# 2. MEASUREMENT
+
+def measure(compile_fn, *inputs):
+    """Returns (seconds, peak traced bytes) for one compile."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = compile_fn(*inputs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+def make_turns(count, turn_ms, frequency=220):
+    """Builds `count` mixer-format turns (44.1 kHz/16-bit/stereo)."""
+    tone = (Sine(frequency).to_audio_segment(duration=turn_ms)
+                     .set_frame_rate(MIXER_FREQUENCY).set_channels(MIXER_CHANNELS)
+                     .set_sample_width(MIXER_SAMPLE_WIDTH))
+    return [tone] * count
+
+def as_turn_arrays(segments):
+    """The turns as V4 keeps them: int16 (frames, 2) views of their PCM."""
+    return [np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, MIXER_CHANNELS) for segment in segments]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scene compile benchmark")
+    parser.add_argument("--turn-ms", type=int, default=250, help="Length of each turn.")
+    parser.add_argument("--sfx-ms", type=int, default=5000, help="Length of the SFX shared by every turn.")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    sfx = as_turn_arrays(make_turns(1, args.sfx_ms, frequency=660))[0]  # Like SfxCache.get_array()
+    print(f"{'turns':>6} | {'+= loop (s)':>12} {'peak MB':>9} | {'timeline (s)':>15} {'peak MB':>9} | "
+          f"speedup | {'+ SFX (s)':>10} {'peak MB':>9}")
+    sfx_peaks = []
+    for count in args.turns:
+        segments = make_turns(count, args.turn_ms)
+        old_s, old_peak = measure(compile_incremental, segments)
+        new_s, new_peak = measure(compile_timeline, as_turn_arrays(segments))
+        sfx_s, sfx_peak = measure(compile_timeline, as_turn_arrays(segments), sfx)
+        sfx_peaks.append(sfx_peak)
+        speedup = old_s / new_s if new_s else float("inf")
+        print(f"{count:>6} | {old_s:>12.4f} {old_peak / 1e6:>9.1f} | "
+              f"{new_s:>15.4f} {new_peak / 1e6:>9.1f} | {speedup:>6.1f}x | "
+              f"{sfx_s:>10.4f} {sfx_peak / 1e6:>9.1f}")
+
+    # The mix is streamed and turns/SFX are shared views: peak memory must not follow the turn count
+    growth = max(sfx_peaks) / min(sfx_peaks)
+    if growth < FLAT_MEMORY_GROWTH:
+        print(f"✅ Compile memory is flat ({growth:.2f}x from {min(args.turns)} to {max(args.turns)} turns).")
+    else:
+        print(f"❌ Compile memory grows with the scene ({growth:.2f}x from {min(args.turns)} to {max(args.turns)} turns).")
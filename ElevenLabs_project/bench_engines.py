@@ -0,0 +1,202 @@
+# bench_engines.py
+#
+# End-to-end offline benchmarks against fake_elevenlabs.FakeElevenLabs:
+# process_scene_turn, the V4 compile step and every generate_and_play_scene
+# variant. Reports per-turn latency percentiles, throughput and peak RSS.
+# Usage: python bench_engines.py [--turns 20] [--latency 0.15] [--json results.json]
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+# The engines read these at import time: no sound card, no real key, fresh cache
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("ELEVENLABS_API_KEY", "fake-benchmark-key")
+os.environ.setdefault("TTS_CACHE_DIR", tempfile.mkdtemp(prefix="bench_tts_cache_"))
+
+import audio_formats
+from fake_elevenlabs import FakeElevenLabs
+from elevenlabs_client import set_client
+from request_scheduler import ScheduledClient
+
+SAMPLE_LINES = [
+    "We move at dawn.",
+    "Stay low and keep quiet, they are right behind the wall.",
+    "I never thought it would end like this.",
+    "Hold the line!",
+    "Every step we take from here is a step we cannot take back.",
+]
+
+# -------------------------------------------------------------
+# 1. MEASUREMENT HELPERS
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_benchmark(name, calls):
+    """Runs each zero-argument callable, timing it. A None/False result counts as a failure."""
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+    for call in calls:
+        t0 = time.perf_counter()
+        result = call()
+        latencies.append(time.perf_counter() - t0)
+        if result is None or result is False:
+            failures += 1
+    wall = time.perf_counter() - start
+    return {
+        "benchmark": name,
+        "calls": len(latencies),
+        "failures": failures,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_per_s": len(latencies) / wall if wall else float("inf"),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def script_lines(engine_name, turns):
+    # Unique text per engine and turn so the synthesis cache never short-circuits the API
+    return [f"{SAMPLE_LINES[i % len(SAMPLE_LINES)]} ({engine_name} {i})" for i in range(turns)]
+
+# -------------------------------------------------------------
+# 2. THE BENCHMARKS
+
+def bench_v4(fake, turns, review, music=None, draft=False):
+    import automator_engine_V4 as v4
+    set_client(fake)
+    if review and not v4.initialize_audio_engine(draft=draft):
+        review = False
+
+    rendered_turns = []
+    def turn(i, line):
+        def call():
+            final_text = v4.apply_mood_xml(line, "TENSE")
+            rendered = v4.process_scene_turn(final_text, "Greg", "NONE", i, review=review, draft=draft)
+            if rendered is not None:
+                rendered_turns.append(rendered)
+            return rendered
+        return call
+
+    results = [run_benchmark("V4 process_scene_turn",
+                             [turn(i, line) for i, line in enumerate(script_lines("v4", turns), 1)])]
+    v4.playback_worker.shutdown()
+
+    output_file = os.path.join(tempfile.mkdtemp(prefix="bench_compile_"), "scene.mp3")
+    def compile_call():
+        if not rendered_turns:
+            return None
+        v4.compile_scene(rendered_turns, output_file, music=music)
+        return os.path.exists(output_file)
+    results.append(run_benchmark("V4 compile_scene", [compile_call]))
+    return results
+
+def bench_automator_engine(fake, turns):
+    import automator_engine
+    set_client(fake)
+    if not automator_engine.initialize_audio_engine():
+        return []
+    def turn(line):
+        def call():
+            automator_engine.generate_and_play_scene(line, "JBKXQq8eu7bjrKXhy7MD", "NONE")
+            automator_engine.playback_worker.wait_idle()  # Include playback in the turn time
+            return True
+        return call
+    return [run_benchmark("automator_engine generate_and_play_scene",
+                          [turn(line) for line in script_lines("automator", turns)])]
+
+def bench_emotion_engine(fake, turns):
+    import emotion_engine
+    set_client(fake)
+    if not emotion_engine.initialize_audio_engine():
+        return []
+    def turn(line):
+        def call():
+            emotion_engine.generate_and_play_scene(line, "Tense Stealth")
+            emotion_engine.playback_worker.wait_idle()
+            return True
+        return call
+    return [run_benchmark("emotion_engine generate_and_play_scene",
+                          [turn(line) for line in script_lines("emotion", turns)])]
+
+def bench_emotion_engine_v2(fake, turns):
+    import emotion_engine_v2
+    set_client(fake)
+    if not emotion_engine_v2.initialize_audio_engine():
+        return []
+    def turn(line):
+        def call():
+            emotion_engine_v2.generate_and_play_scene(line, "Tense Stealth")
+            return True
+        return call
+    return [run_benchmark("emotion_engine_v2 generate_and_play_scene",
+                          [turn(line) for line in script_lines("emotion_v2", turns)])]
+
+BENCHMARKS = {
+    "v4": lambda fake, args: bench_v4(fake, args.turns, args.review, args.music, args.draft_review),
+    "automator": lambda fake, args: bench_automator_engine(fake, args.turns),
+    "emotion": lambda fake, args: bench_emotion_engine(fake, args.turns),
+    "emotion_v2": lambda fake, args: bench_emotion_engine_v2(fake, args.turns),
+}
+
+# -------------------------------------------------------------
+# 3. REPORT
+
+def print_report(results):
+    print(f"\n{'benchmark':<44} {'calls':>5} {'fail':>4} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'per s':>7} {'RSS MB':>7}")
+    for r in results:
+        print(f"{r['benchmark']:<44} {r['calls']:>5} {r['failures']:>4} {r['p50_ms']:>9.1f} "
+              f"{r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['throughput_per_s']:>7.2f} "
+              f"{r['peak_rss_mb']:>7.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline engine benchmarks (fake ElevenLabs API)")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.15, help="Fake time-to-first-byte (s).")
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--chunk-delay", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seconds-per-char", type=float, default=0.02,
+                        help="Fake speech length; keep small, playback runs in real time.")
+    parser.add_argument("--review", action="store_true", help="Include V4 review playback.")
+    parser.add_argument("--draft-review", action="store_true", help="With --review: draft-quality previews.")
+    parser.add_argument("--music", metavar="SCENE_NAME", help="Compile the V4 scene over this score.")
+    parser.add_argument("--scheduled", action="store_true",
+                        help="Route the fake client through the RequestScheduler (retries, throttling).")
+    parser.add_argument("--output-format", default=audio_formats.TTS_OUTPUT_FORMAT,
+                        help="convert() output_format the engines request (e.g. pcm_44100, mp3_44100_128).")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON.")
+    args = parser.parse_args()
+    audio_formats.TTS_OUTPUT_FORMAT = args.output_format  # Before the engines are imported
+
+    results = []
+    for name in args.only:
+        fake = FakeElevenLabs(latency=args.latency, chunk_size=args.chunk_size,
+                              chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+                              seconds_per_char=args.seconds_per_char)
+        client = ScheduledClient(fake) if args.scheduled else fake
+        results.extend(BENCHMARKS[name](client, args))
+        if args.scheduled:
+            print(f"📊 {name} scheduler: {client.scheduler.stats()}")
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
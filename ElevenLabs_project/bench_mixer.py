@@ -0,0 +1,82 @@
+# bench_mixer.py
+#
+# Compares pydub overlay chains with numpy_mixer.mix_layers() on dense
+# scenes: one long dialogue track plus many SFX placements, each with its
+# own offset, gain and fades. Reports mixing speed as a multiple of real time.
+# Usage: python bench_mixer.py [--scene-seconds 60] [--layers 4 16 64]
+
+import argparse
+import random
+import time
+from pydub.generators import Sine
+from audio_formats import MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH
+from numpy_mixer import make_layer, mix_layers, array_to_segment
+
+# -------------------------------------------------------------
+# 1. THE TWO MIXERS
+
+def make_scene(scene_seconds, layer_count, seed=0):
+    """Returns (dialogue, [(sfx, offset_ms, gain_db, fade_in_ms, fade_out_ms)])."""
+    rng = random.Random(seed)
+
+    def tone(frequency, ms):
+        return (Sine(frequency).to_audio_segment(duration=ms, volume=-12.0)
+                               .set_frame_rate(MIXER_FREQUENCY).set_channels(MIXER_CHANNELS)
+                               .set_sample_width(MIXER_SAMPLE_WIDTH))
+
+    dialogue = tone(220, scene_seconds * 1000)
+    placements = []
+    for _ in range(layer_count):
+        length_ms = rng.randint(500, 5000)
+        placements.append((
+            tone(rng.randint(300, 1200), length_ms),
+            rng.randint(0, scene_seconds * 1000 - length_ms),
+            rng.uniform(-12.0, 0.0),
+            rng.randint(0, 200),
+            rng.randint(0, 500),
+        ))
+    return dialogue, placements
+
+def mix_pydub(dialogue, placements):
+    """One overlay() per layer, gain and fades applied by pydub."""
+    mixed = dialogue - 3.0
+    for sfx, offset_ms, gain_db, fade_in_ms, fade_out_ms in placements:
+        layer = sfx.apply_gain(gain_db)
+        if fade_in_ms:
+            layer = layer.fade_in(fade_in_ms)
+        if fade_out_ms:
+            layer = layer.fade_out(fade_out_ms)
+        mixed = mixed.overlay(layer, position=offset_ms)
+    return mixed
+
+def mix_numpy(dialogue, placements):
+    layers = [make_layer(dialogue, gain_db=-3.0)]
+    layers += [make_layer(sfx, offset_ms, gain_db, fade_in_ms, fade_out_ms)
+               for sfx, offset_ms, gain_db, fade_in_ms, fade_out_ms in placements]
+    return array_to_segment(mix_layers(layers, length_ms=len(dialogue)))
+
+# -------------------------------------------------------------
+# 2. MEASUREMENT
+
+def measure(mix_fn, dialogue, placements, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        mix_fn(dialogue, placements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-layer mix benchmark")
+    parser.add_argument("--scene-seconds", type=int, default=60)
+    parser.add_argument("--layers", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'layers':>6} | {'pydub (s)':>10} {'x realtime':>11} | {'numpy (s)':>10} {'x realtime':>11} | speedup")
+    for layer_count in args.layers:
+        dialogue, placements = make_scene(args.scene_seconds, layer_count)
+        old_s = measure(mix_pydub, dialogue, placements, args.repeats)
+        new_s = measure(mix_numpy, dialogue, placements, args.repeats)
+        print(f"{layer_count:>6} | {old_s:>10.3f} {args.scene_seconds / old_s:>10.0f}x | "
+              f"{new_s:>10.3f} {args.scene_seconds / new_s:>10.0f}x | {old_s / new_s:>6.1f}x")
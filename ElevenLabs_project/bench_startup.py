@@ -0,0 +1,105 @@
+# bench_startup.py
+#
+# Cold-start benchmark for script validation: runs
+# `automator_engine_V4.py --batch SCRIPT --validate` in fresh interpreters
+# under `python -X importtime`, reports wall time and the slowest imports,
+# and fails if the run is over budget or pulls in a heavy dependency.
+# Usage: python bench_startup.py [--runs 5] [--budget-ms 250]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = 250  # Median wall time for a validation run, interpreter start included
+
+# Validation must not need any of these (audio stack, SDK, HTTP, .env loading, NumPy)
+HEAVY_MODULES = ("elevenlabs", "httpx", "pydub", "pygame", "dotenv", "numpy")
+
+SAMPLE_SCRIPT = [
+    ["We move at dawn.", "Greg", "TENSE", "NONE"],
+    ["", "NONE (SFX Only)", "NONE", "NONE"],
+    ["Hold the line!", "Greg", "NONE", "NONE"],
+]
+
+# -------------------------------------------------------------
+# 1. MEASUREMENT
+
+def parse_importtime(stderr):
+    """Returns [(module, cumulative_us)] from `-X importtime` output."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        imports.append((module.strip(), int(cumulative)))
+    return imports
+
+def cold_run(argv, env):
+    """Runs argv in a fresh interpreter; returns (wall seconds, imports)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=PROJECT_DIR,
+                            env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} failed:\n{result.stdout}{result.stderr}")
+    return wall, parse_importtime(result.stderr)
+
+# -------------------------------------------------------------
+# 2. THE BENCHMARK
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for V4 script validation")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list.")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON.")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(SAMPLE_SCRIPT, f)
+        script_path = f.name
+
+    # No API key and an empty cache: validation must work without either
+    env = dict(os.environ, TTS_CACHE_DIR=tempfile.mkdtemp(prefix="bench_startup_cache_"))
+    env.pop("ELEVENLABS_API_KEY", None)
+    argv = ["automator_engine_V4.py", "--batch", script_path, "--validate"]
+
+    cold_run(argv, env)  # Warm the .pyc files, not the interpreter
+    walls = []
+    imports = []
+    for _ in range(args.runs):
+        wall, imports = cold_run(argv, env)
+        walls.append(wall)
+    os.remove(script_path)
+
+    median_ms = statistics.median(walls) * 1000
+    heavy = sorted({module for module, _ in imports if module.split(".")[0] in HEAVY_MODULES})
+
+    print(f"\nValidation cold start: median {median_ms:.1f} ms, "
+          f"min {min(walls) * 1000:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"Slowest imports (cumulative):")
+    top_level = [(module, us) for module, us in imports if "." not in module]
+    for module, us in sorted(top_level, key=lambda item: -item[1])[:args.top]:
+        print(f"   {module:<32} {us / 1000:8.1f} ms")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median {median_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if heavy:
+        failures.append(f"heavy modules imported: {', '.join(heavy)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"median_ms": median_ms, "runs_ms": [w * 1000 for w in walls],
+                       "budget_ms": args.budget_ms, "heavy_modules": heavy}, f, indent=2)
+
+    if failures:
+        print("❌ " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Within budget.")
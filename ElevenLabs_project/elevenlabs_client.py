@@ -0,0 +1,84 @@
+# elevenlabs_client.py
+
+import os
+import threading
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION (override via .env)
+
+PLACEHOLDER_API_KEY = "YOUR_ACTUAL_ELEVENLABS_API_KEY_HERE"
+HTTP_MAX_CONNECTIONS = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", 8))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("ELEVENLABS_TIMEOUT_SECONDS", 240))
+
+_client = None
+_client_lock = threading.Lock()
+_env_loaded = False
+
+# -------------------------------------------------------------
+# 2. LAZY ENVIRONMENT & CLIENT FACTORY
+
+def load_environment():
+    """Loads .env once per process (python-dotenv is only imported here)."""
+    global _env_loaded
+    if not _env_loaded:
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass  # Plain environment variables still work
+        _env_loaded = True
+
+def load_api_key():
+    """Returns ELEVENLABS_API_KEY from the environment or .env, or None."""
+    load_environment()
+    return os.getenv("ELEVENLABS_API_KEY")
+
+def build_client(api_key=None):
+    """
+    Builds a rate-limited ElevenLabs client on one pooled httpx.Client, so
+    every request in the process reuses the same keep-alive connections.
+    """
+    import httpx
+    from elevenlabs.client import ElevenLabs
+    from request_scheduler import ScheduledClient
+
+    api_key = api_key or load_api_key()
+    if not api_key:
+        # Fallback/Test Key for local development (MUST BE REPLACED WITH YOUR KEY)
+        print("⚠️ API_KEY not loaded from .env. Using hardcoded test mode.")
+        api_key = PLACEHOLDER_API_KEY
+
+    http_client = httpx.Client(
+        timeout=HTTP_TIMEOUT_SECONDS,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+    )
+    options = {}
+    base_url = os.getenv("ELEVENLABS_BASE_URL")  # e.g. the fake_elevenlabs server
+    if base_url:
+        options["base_url"] = base_url
+    return ScheduledClient(ElevenLabs(api_key=api_key, httpx_client=http_client, **options))
+
+def get_client(api_key=None):
+    """
+    Returns the shared client, building it on first use. api_key only
+    matters for that first call (defaults to ELEVENLABS_API_KEY).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_client(api_key)
+    return _client
+
+def set_client(client):
+    """Replaces the shared client (e.g. with fake_elevenlabs.FakeElevenLabs). Returns the old one."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
+
+def active_client():
+    """Returns the shared client if one has been built or set, else None."""
+    return _client
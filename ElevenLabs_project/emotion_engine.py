@@ -1,10 +1,11 @@
-import pygame
-import io
 import time  # For controlling playback flow
-import os
-from dotenv import load_dotenv 
-from elevenlabs.client import ElevenLabs 
-from elevenlabs import Voice 
+from elevenlabs_client import get_client, load_api_key
+from synthesis_cache import SynthesisCache
+from audio_formats import TTS_OUTPUT_FORMAT, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH, MIXER_CHANNELS, load_sound
+from stream_player import stream_play, prefetch_chunks
+from playback_worker import PlaybackWorker
+from pipeline_metrics import metrics
+from music_library import MusicLibrary
 
 # -------------------------------------------------------------
 # 2. CONFIGURATION (The Architect's Parameters)
@@ -12,26 +13,35 @@ from elevenlabs import Voice
 # Load variables from the .env file (Requires: pip3 install python-dotenv)
 # Ensure you have a file named '.env' in your project folder with:
 # ELEVENLABS_API_KEY=YOUR_ACTUAL_API_KEY_HERE
-load_dotenv() 
-API_KEY = os.getenv("ELEVENLABS_API_KEY") 
-
-if not API_KEY:
-    raise ValueError("ELEVENLABS_API_KEY not found in .env file.")
+# The key is read (and the client built) on first use, see elevenlabs_client.py
 
 VOICE_ID = "JBKXQq8eu7bjrKXhy7MD" # Example voice ID
 MODEL_ID = "eleven_multilingual_v2" # Recommended high-quality model
+STREAMING_PLAYBACK = True # Start playback while the API is still streaming
+
+# Emotional scores, indexed from music_library.csv
+music_library = MusicLibrary()
+
+# Scene playback runs here, so the next prompt can start while this one is audible
+playback_worker = PlaybackWorker()
 
-# Initialize the ElevenLabs client
-client = ElevenLabs(api_key=API_KEY) 
+# Persistent cache of rendered lines (keyed on voice, model, SSML and format)
+tts_cache = SynthesisCache()
 
 # -------------------------------------------------------------
 
+# Pygame is imported by initialize_audio_engine(), so importing this module stays cheap
+pygame = None
+
 def initialize_audio_engine():
-    """Initializes Pygame and its mixer for audio playback."""
+    """Imports and initializes Pygame and its mixer for audio playback."""
+    global pygame
+    import pygame
+
     try:
         pygame.init()
         # Initialize the mixer with standard high-quality audio parameters
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        pygame.mixer.init(frequency=MIXER_FREQUENCY, size=-8 * MIXER_SAMPLE_WIDTH, channels=MIXER_CHANNELS, buffer=512)
         print("✅ Pygame Audio Mixer Initialized.")
         return True
     except pygame.error as e:
@@ -39,18 +49,21 @@ def initialize_audio_engine():
         return False
 
 def generate_and_play_scene(dialogue_text, emotional_score):
-    """Generates audio via the corrected SDK method and plays it using Pygame."""
+    """Generates audio via the corrected SDK method and queues it for Pygame playback
+    on the playback worker (returns without waiting for playback to finish)."""
     
     print(f"🎙️ Generating dialogue for '{emotional_score}'...")
     
     # 3. ELEVENLABS GENERATION (The Corrected SDK Call)
+    request_start = time.perf_counter()
     try:
         # The correct method for the current SDK version returns a generator (stream)
-        audio_data_generator = client.text_to_speech.convert(
+        audio_data_generator = tts_cache.convert(
+            get_client(),
             text=dialogue_text,
             voice_id=VOICE_ID,
             model_id=MODEL_ID,
-            output_format="mp3_44100_128", # High quality output format
+            output_format=TTS_OUTPUT_FORMAT, # TTS_OUTPUT_FORMAT=pcm_44100 (Pro plans): plays without a decode
         )
         print("✅ Audio data successfully received.")
     
@@ -58,30 +71,45 @@ def generate_and_play_scene(dialogue_text, emotional_score):
         print(f"❌ Error during ElevenLabs generation. Check API Key/Network/Rate Limits: {e}")
         return
 
+    # Streaming mode: decode and play chunks as the API yields them
+    if STREAMING_PLAYBACK:
+        # Start the request now; playback may still be busy with the previous scene
+        audio_data_generator = prefetch_chunks(audio_data_generator)
+
+        def stream_job():
+            try:
+                print(f"▶️ Streaming scene: '{emotional_score}'...")
+                with metrics.span("stream_playback"):
+                    time_to_first_sample = stream_play(audio_data_generator, input_format=TTS_OUTPUT_FORMAT,
+                                                       started_at=request_start)
+                if time_to_first_sample is not None:
+                    metrics.record("first_sample", time_to_first_sample)
+                    print(f"⏱️ Time to first sample: {time_to_first_sample:.2f}s")
+                print("⏹️ Playback complete.")
+            except Exception as e:
+                print(f"❌ Error during streamed generation/playback: {e}")
+
+        playback_worker.submit(stream_job)
+        return
+
     # 4. PYGAME PLAYBACK (The Final Stream Fix)
     
     # --- FIX: Collect all chunks from the generator and join into single bytes object ---
     try:
         # Assemble all byte chunks from the generator into one complete object
-        audio_bytes = b"".join(audio_data_generator) 
+        with metrics.span("api"):
+            audio_bytes = b"".join(audio_data_generator) 
     except TypeError as e:
         print(f"❌ Failed to assemble audio bytes. Generator issue: {e}")
         return
 
-    # Use io.BytesIO on the assembled bytes
-    audio_buffer = io.BytesIO(audio_bytes)
-
     try:
-        sound = pygame.mixer.Sound(audio_buffer)
+        with metrics.span("decode"):
+            sound = load_sound(audio_bytes, TTS_OUTPUT_FORMAT)
         
         print(f"▶️ Playing scene: '{emotional_score}'...")
-        channel = sound.play()
-        
-        # Wait until the audio finishes playing
-        while channel.get_busy():
-            time.sleep(0.1)
-        
-        print("⏹️ Playback complete.")
+        # The playback worker plays it in order and waits for the end off the main thread
+        playback_worker.submit_sound(sound, on_done=lambda: print("⏹️ Playback complete."))
         
     except pygame.error as e:
         print(f"❌ Pygame Playback Error. Audio format may be incompatible: {e}")
@@ -91,6 +119,9 @@ def generate_and_play_scene(dialogue_text, emotional_score):
 # 5. THE MAIN ENGINE LOOP (The Mission Execution)
 
 if __name__ == "__main__":
+    if not load_api_key():
+        raise ValueError("ELEVENLABS_API_KEY not found in .env file.")
+
     if not initialize_audio_engine():
         exit()
         
@@ -102,27 +133,29 @@ if __name__ == "__main__":
         if dialogue.lower() == 'quit':
             break
 
-        # Simple logic for emotional choice
+        # Emotional choice, built from the music library index
         print("\nNow, choose the emotional score for the scene:")
-        print("1. Heroic Climax (Triumphant, inspiring music for a final battle)")
-        print("2. Tense Stealth (Low, anxious strings for a stealth mission)")
-        print("3. Somber Sacrifice (A sad, slow piano for a moment of loss)")
-        choice = input("Enter your choice (1, 2, or 3): ")
-
-        if choice == '1':
-            score = "Heroic Climax"
-        elif choice == '2':
-            score = "Tense Stealth"
-        elif choice == '3':
-            score = "Somber Sacrifice"
-        else:
+        for track in music_library.tracks:
+            length = music_library.duration(track["scene_name"])
+            length = f" [{length:.0f}s]" if length else ""
+            print(f"{track['id']}. {track['scene_name']} {track['description']}{length}")
+        choice = input("Enter your choice (number): ")
+
+        try:
+            track = music_library.by_id(choice)
+        except ValueError:
+            track = None
+        if track is None:
             print("Invalid choice. Try again.")
             continue
+        score = track["scene_name"]
         
         # Execute the scene
         print(f"\n🎬 Staging scene: '{score}'...")
         generate_and_play_scene(dialogue, score)
 
-    # Clean up Pygame resources and systems
+    # Let queued scenes finish, then clean up Pygame resources and systems
+    playback_worker.shutdown()
+    metrics.print_summary()
     pygame.quit()
     print("Engine shut down. Mission complete.")
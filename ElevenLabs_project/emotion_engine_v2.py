@@ -1,10 +1,11 @@
-import pygame
 import io
 import time  # For controlling playback flow
-import os
-from dotenv import load_dotenv 
-from elevenlabs.client import ElevenLabs 
-from elevenlabs import Voice 
+from elevenlabs_client import get_client
+from synthesis_cache import SynthesisCache
+from audio_formats import TTS_OUTPUT_FORMAT, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH, MIXER_CHANNELS
+from stream_player import stream_play
+from music_library import MusicLibrary
+from pipeline_metrics import metrics
 
 # -------------------------------------------------------------
 # 2. CONFIGURATION (The Architect's Parameters)
@@ -12,35 +13,35 @@ from elevenlabs import Voice
 # Load variables from the .env file (Requires: pip3 install python-dotenv)
 # Ensure you have a file named '.env' in your project folder with:
 # ELEVENLABS_API_KEY=YOUR_ACTUAL_API_KEY_HERE
-#load_dotenv() 
-#API_KEY = os.getenv("ELEVENLABS_API_KEY") 
+# The key is read (and the client built) on first use, see elevenlabs_client.py
 
-#if not API_KEY:
-#    raise ValueError("ELEVENLABS_API_KEY not found in .env file.")
-API_KEY = "sk_0cdf46dd659d5f29a25d816745c8565a06b9540ef6698dd5" # TEST LINE
 VOICE_ID = "JBKXQq8eu7bjrKXhy7MD" # Example voice ID
 MODEL_ID = "eleven_multilingual_v2" # Recommended high-quality model
+STREAMING_PLAYBACK = True # Start playback while the API is still streaming
 
-# NEW: Map emotional scores to music files (The Mythic Layer)
-# !!! You MUST create and place these three .mp3 files in the project folder !!!
-MUSIC_ASSETS = {
-    "Heroic Climax": "heroic_climax.mp3",
-    "Tense Stealth": "tense_stealth.mp3",
-    "Somber Sacrifice": "somber_sacrifice.mp3",
-}
+# Map emotional scores to music files (The Mythic Layer), indexed from music_library.csv
+music_library = MusicLibrary()
 
-# Initialize the ElevenLabs client
-client = ElevenLabs(api_key=API_KEY) 
+# Persistent cache of rendered lines (keyed on voice, model, SSML and format)
+tts_cache = SynthesisCache()
 
 # -------------------------------------------------------------
 
+# Pygame is imported by initialize_audio_engine(), so importing this module stays cheap
+pygame = None
+
 def initialize_audio_engine():
-    """Initializes Pygame and its mixer for audio playback."""
+    """Imports and initializes Pygame and its mixer for audio playback."""
+    global pygame
+    import pygame
+
     try:
         pygame.init()
         # Initialize the mixer with standard high-quality audio parameters
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+        pygame.mixer.init(frequency=MIXER_FREQUENCY, size=-8 * MIXER_SAMPLE_WIDTH, channels=MIXER_CHANNELS, buffer=512)
         print("✅ Pygame Audio Mixer Initialized.")
+        # Decode the score stems in the background so choosing one is instant
+        music_library.prewarm()
         return True
     except pygame.error as e:
         print(f"❌ Error initializing Pygame mixer. Check system audio or drivers: {e}")
@@ -51,28 +52,32 @@ def generate_and_play_scene(dialogue_text, emotional_score):
     concurrently with the background music score."""
     
     # 1. Start the Background Music
-    music_file = MUSIC_ASSETS.get(emotional_score)
-    if music_file:
+    track = music_library.by_name(emotional_score)
+    if track:
         try:
-            # Use mixer.music.load() for long background tracks
-            pygame.mixer.music.load(music_file)
-            # Play the music once (loops=0)
-            pygame.mixer.music.play(loops=0) 
-            print(f"🎵 Playing background score: '{emotional_score}'...")
+            # Prewarmed stem if ready, otherwise streamed via mixer.music (played once, loops=0)
+            with metrics.span("music_start"):
+                music_started = music_library.play(emotional_score, loops=0)
+            if music_started:
+                print(f"🎵 Playing background score: '{emotional_score}'...")
+            else:
+                print(f"⚠️ Warning: Music file '{track['filename']}' not found in /music.")
         except pygame.error as e:
-            print(f"⚠️ Warning: Could not load music file '{music_file}'. Ensure file exists: {e}")
+            print(f"⚠️ Warning: Could not load music file '{track['filename']}'. Ensure file exists: {e}")
             
     print(f"🎙️ Generating dialogue for '{emotional_score}'...")
     
     # 2. ELEVENLABS GENERATION (The Corrected SDK Call)
+    request_start = time.perf_counter()
     try:
         # THE SYNTAX ERROR IS FIXED HERE: The final ')' is present.
         # The correct method for the current SDK version returns a generator (stream)
-        audio_data_generator = client.text_to_speech.convert(
+        audio_data_generator = tts_cache.convert(
+            get_client(),
             text=dialogue_text,
             voice_id=VOICE_ID,
             model_id=MODEL_ID,
-            output_format="mp3_44100_128", 
+            output_format=TTS_OUTPUT_FORMAT, 
         ) # <--- The closing parenthesis is here!
         print("✅ Audio data successfully received.")
     
@@ -80,12 +85,28 @@ def generate_and_play_scene(dialogue_text, emotional_score):
         print(f"❌ Error during ElevenLabs generation. Check API Key/Network/Rate Limits: {e}")
         return
 
+    # Streaming mode: decode and play chunks as the API yields them
+    if STREAMING_PLAYBACK:
+        try:
+            print(f"▶️ Streaming scene: '{emotional_score}'...")
+            with metrics.span("stream_playback"):
+                time_to_first_sample = stream_play(audio_data_generator, input_format=TTS_OUTPUT_FORMAT,
+                                                   started_at=request_start)
+            if time_to_first_sample is not None:
+                metrics.record("first_sample", time_to_first_sample)
+                print(f"⏱️ Time to first sample: {time_to_first_sample:.2f}s")
+            print("⏹️ Playback complete.")
+        except Exception as e:
+            print(f"❌ Error during streamed generation/playback: {e}")
+        return
+
     # 3. PYGAME PLAYBACK (The Final Stream Fix)
     
     # FIX: Assemble all byte chunks from the generator and join into single bytes object
     try:
         # This line was corrected to include the full generator name and the closing parenthesis.
-        audio_bytes = b"".join(audio_data_generator) 
+        with metrics.span("api"):
+            audio_bytes = b"".join(audio_data_generator) 
     except TypeError as e:
         print(f"❌ Failed to assemble audio bytes. Generator issue: {e}")
         return
@@ -0,0 +1,221 @@
+# fake_elevenlabs.py
+#
+# Offline stand-in for the ElevenLabs text-to-speech API.
+# - FakeElevenLabs: injectable client, installed for every engine with
+#   elevenlabs_client.set_client(FakeElevenLabs(...))
+# - make_fake_server(): local HTTP server speaking POST /v1/text-to-speech/{voice_id}
+#   (run this file to start one), for the real client built with
+#   ELEVENLABS_BASE_URL=http://127.0.0.1:8765
+# Audio is deterministic (a tone derived from voice + text), with configurable
+# latency, chunking and error rates.
+
+import argparse
+import array
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from audio_formats import parse_output_format
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+DEFAULT_LATENCY = 0.15  # Seconds before the first chunk (time-to-first-byte)
+DEFAULT_CHUNK_SIZE = 4096  # Bytes per streamed chunk
+DEFAULT_CHUNK_DELAY = 0.005  # Seconds between chunks
+DEFAULT_SECONDS_PER_CHAR = 0.06  # Roughly conversational speaking rate
+MAX_AUDIO_SECONDS = 30.0
+
+# MPEG-1 Layer III tables for the encoder-free silent MP3 fallback
+MP3_BITRATE_INDEX = {32: 1, 40: 2, 48: 3, 56: 4, 64: 5, 80: 6, 96: 7,
+                     112: 8, 128: 9, 160: 10, 192: 11, 224: 12, 256: 13, 320: 14}
+MP3_SAMPLE_RATE_INDEX = {44100: 0, 48000: 1, 32000: 2}
+MP3_SAMPLES_PER_FRAME = 1152
+
+# -------------------------------------------------------------
+# 2. DETERMINISTIC AUDIO
+
+def synthesize_pcm(text, voice_id, sample_rate, seconds_per_char=DEFAULT_SECONDS_PER_CHAR):
+    """Returns mono 16-bit PCM: a tone whose pitch depends on voice and text."""
+    seed = int(hashlib.sha256(f"{voice_id}|{text}".encode("utf-8")).hexdigest()[:8], 16)
+    frequency = 110 + seed % 330
+    duration = min(max(len(text) * seconds_per_char, 0.2), MAX_AUDIO_SECONDS)
+    step = 2 * math.pi * frequency / sample_rate
+    samples = array.array("h", (int(8000 * math.sin(i * step)) for i in range(int(duration * sample_rate))))
+    return samples.tobytes(), duration
+
+def silent_mp3(duration, sample_rate, bitrate):
+    """Builds a valid mono MP3 of silent frames without needing an encoder."""
+    if sample_rate not in MP3_SAMPLE_RATE_INDEX or bitrate not in MP3_BITRATE_INDEX:
+        raise ValueError(f"Silent MP3 fallback does not support {sample_rate} Hz / {bitrate} kbps.")
+    header = bytes([
+        0xFF, 0xFB,  # Frame sync, MPEG-1, Layer III, no CRC
+        (MP3_BITRATE_INDEX[bitrate] << 4) | (MP3_SAMPLE_RATE_INDEX[sample_rate] << 2),
+        0xC0,  # Mono
+    ])
+    frame_length = 144 * bitrate * 1000 // sample_rate
+    frame = header + b"\x00" * (frame_length - len(header))
+    frames = math.ceil(duration * sample_rate / MP3_SAMPLES_PER_FRAME)
+    return frame * frames
+
+def encode_audio(pcm, duration, codec, sample_rate, bitrate):
+    """Encodes mono PCM to the requested codec (MP3 via pydub/ffmpeg when available)."""
+    if codec == "pcm":
+        return pcm
+    if codec != "mp3":
+        raise ValueError(f"Unsupported fake output format codec: {codec}")
+    try:
+        import io
+        from pydub import AudioSegment
+        segment = AudioSegment(data=pcm, sample_width=2, frame_rate=sample_rate, channels=1)
+        buffer = io.BytesIO()
+        segment.export(buffer, format="mp3", bitrate=f"{bitrate}k")
+        return buffer.getvalue()
+    except Exception:
+        # No encoder on this machine: silent frames still exercise the decode path
+        return silent_mp3(duration, sample_rate, bitrate)
+
+# -------------------------------------------------------------
+# 3. THE FAKE API (Latency, Chunking, Errors)
+
+def _api_error(status_code, retry_after):
+    from elevenlabs.core.api_error import ApiError
+    return ApiError(
+        status_code=status_code,
+        headers={"retry-after": str(retry_after)},
+        body={"detail": {"status": "fake_error", "message": f"Injected HTTP {status_code}"}},
+    )
+
+
+class FakeElevenLabs:
+    """
+    Drop-in for elevenlabs.client.ElevenLabs in the engines (only
+    text_to_speech.convert is provided). Like the real SDK, convert()
+    returns a lazy generator: latency and errors hit on the first next().
+    """
+
+    def __init__(self, latency=DEFAULT_LATENCY, chunk_size=DEFAULT_CHUNK_SIZE,
+                 chunk_delay=DEFAULT_CHUNK_DELAY, error_rate=0.0, error_status=429,
+                 retry_after=1, seconds_per_char=DEFAULT_SECONDS_PER_CHAR, seed=0):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.seconds_per_char = seconds_per_char
+        self.requests = 0
+        self.characters = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._rendered = {}  # (text, voice_id, output_format) -> encoded bytes
+        self.text_to_speech = _FakeTextToSpeech(self)
+
+    def render(self, text, voice_id, output_format):
+        """Returns the full encoded audio for a request (memoized)."""
+        key = (text, voice_id, output_format)
+        with self._lock:
+            audio = self._rendered.get(key)
+        if audio is None:
+            codec, sample_rate, bitrate = parse_output_format(output_format)
+            pcm, duration = synthesize_pcm(text, voice_id, sample_rate, self.seconds_per_char)
+            audio = encode_audio(pcm, duration, codec, sample_rate, bitrate)
+            with self._lock:
+                self._rendered[key] = audio
+        return audio
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            return self._random.random() < self.error_rate
+
+    def stream(self, text, voice_id, output_format):
+        """Generator of audio chunks with the configured latency and errors."""
+        time.sleep(self.latency)
+        if self.should_fail():
+            raise _api_error(self.error_status, self.retry_after)
+        with self._lock:
+            self.characters += len(text)
+
+        audio = self.render(text, voice_id, output_format)
+        for start in range(0, len(audio), self.chunk_size):
+            if start and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield audio[start:start + self.chunk_size]
+
+
+class _FakeTextToSpeech:
+    def __init__(self, fake):
+        self._fake = fake
+
+    def convert(self, voice_id, *, text, model_id=None, output_format="mp3_44100_128", **kwargs):
+        return self._fake.stream(text, voice_id, output_format)
+
+# -------------------------------------------------------------
+# 4. THE FAKE SERVER (Same Behaviour over HTTP)
+
+def make_fake_server(host="127.0.0.1", port=8765, fake=None):
+    """Returns a ThreadingHTTPServer answering POST /v1/text-to-speech/{voice_id}."""
+    fake = fake or FakeElevenLabs()
+
+    class FakeTextToSpeechHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if len(parts) < 3 or parts[:2] != ["v1", "text-to-speech"]:
+                self.send_error(404)
+                return
+            voice_id = parts[2]
+            output_format = parse_qs(url.query).get("output_format", ["mp3_44100_128"])[0]
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            chunks = fake.stream(body.get("text", ""), voice_id, output_format)
+            try:
+                first = next(chunks, b"")
+            except Exception as e:
+                self.send_response(getattr(e, "status_code", 500))
+                self.send_header("Retry-After", str(fake.retry_after))
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps(getattr(e, "body", {"detail": str(e)})).encode())
+                return
+
+            content_type = "audio/mpeg" if output_format.startswith("mp3") else "audio/pcm"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.end_headers()  # HTTP/1.0: body ends when the connection closes
+            self.wfile.write(first)
+            for chunk in chunks:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass  # Keep benchmark output clean
+
+    return ThreadingHTTPServer((host, port), FakeTextToSpeechHandler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake ElevenLabs text-to-speech server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--chunk-delay", type=float, default=DEFAULT_CHUNK_DELAY)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_fake_server(args.host, args.port, FakeElevenLabs(
+        latency=args.latency, chunk_size=args.chunk_size, chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate, seed=args.seed,
+    ))
+    print(f"🧪 Fake ElevenLabs server on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
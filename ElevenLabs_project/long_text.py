@@ -0,0 +1,150 @@
+# long_text.py
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+LONG_TEXT_MAX_CHARS = int(os.getenv("LONG_TEXT_MAX_CHARS", 800))  # Per convert() call, markup included
+LONG_TEXT_WORKERS = 4  # Chunks synthesized at once (the RequestScheduler still bounds the total)
+CROSSFADE_MS = 30
+
+# Sentence end: terminal punctuation, optional closing quotes/brackets, whitespace,
+# and no lowercase word straight after ('"Wait!" he said' stays whole)
+SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s+(?![a-z])")
+TAG = re.compile(r"<[^>]*>")
+WRAPPER = re.compile(r"^\s*(<(\w+)\b[^>]*>)(.*)(</\2\s*>)\s*$", re.DOTALL)
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "e.g.", "i.e.", "etc."}
+
+# -------------------------------------------------------------
+# 2. SPLITTING (Sentence Boundaries, Wrappers Kept Intact)
+
+def unwrap(text):
+    """
+    Peels the outer wrapper tags apply_mood_xml() adds ('<speak>', '<emotion ...>').
+    Returns (opening_tags, body, closing_tags).
+    """
+    opening, closing = [], []
+    match = WRAPPER.match(text)
+    while match:
+        opening.append(match.group(1))
+        closing.insert(0, match.group(4))
+        text = match.group(3)
+        match = WRAPPER.match(text)
+    return "".join(opening), text, "".join(closing)
+
+def _inline_depth(body):
+    """Returns a function: open inline tag depth at a given index of body."""
+    events = []
+    depth = 0
+    for tag in TAG.finditer(body):
+        markup = tag.group(0)
+        if markup.startswith("</"):
+            depth -= 1
+        elif not markup.endswith("/>"):
+            depth += 1
+        events.append((tag.start(), tag.end(), depth))
+
+    def depth_at(index):
+        current = 0
+        for start, end, after in events:
+            if start >= index:
+                break
+            if end > index:
+                return None  # Inside the tag itself
+            current = after
+        return current
+    return depth_at
+
+def split_sentences(body):
+    """Splits text at sentence ends, never inside a tag or an inline element."""
+    depth_at = _inline_depth(body)
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(body):
+        end = match.end()
+        words = body[start:match.start() + len(match.group(0).rstrip())].split()
+        if words and words[-1].lower() in ABBREVIATIONS:
+            continue
+        if depth_at(match.start()) != 0:
+            continue
+        sentences.append(body[start:end].strip())
+        start = end
+    if body[start:].strip():
+        sentences.append(body[start:].strip())
+    return sentences
+
+def _split_long_sentence(sentence, max_chars):
+    """Last resort for a run-on sentence: break at commas, then at spaces."""
+    pieces = []
+    current = ""
+    for part in re.split(r"(?<=[,;:])\s+|\s+", sentence):
+        candidate = f"{current} {part}".strip()
+        if current and len(candidate) > max_chars:
+            pieces.append(current)
+            current = part
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_text(text, max_chars=LONG_TEXT_MAX_CHARS):
+    """
+    Splits a (possibly SSML-wrapped) line into chunks of at most max_chars,
+    at sentence boundaries. Every chunk is re-wrapped in the same outer
+    tags, so each one keeps the mood. Short text is returned unchanged.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    opening, body, closing = unwrap(text)
+    budget = max(max_chars - len(opening) - len(closing), 1)
+
+    chunks = []
+    current = ""
+    for sentence in split_sentences(body):
+        parts = [sentence] if len(sentence) <= budget else _split_long_sentence(sentence, budget)
+        for part in parts:
+            candidate = f"{current} {part}".strip()
+            if current and len(candidate) > budget:
+                chunks.append(current)
+                current = part
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+    return [f"{opening}{chunk}{closing}" for chunk in chunks]
+
+# -------------------------------------------------------------
+# 3. PARALLEL SYNTHESIS & STITCHING
+
+def synthesize_chunks(chunks, synthesize, max_workers=LONG_TEXT_WORKERS):
+    """
+    Runs synthesize(chunk_index, chunk_text) for every chunk concurrently;
+    results come back in chunk order. Latency is that of the slowest chunk
+    rather than the sum. A chunk that raises fails the line: the first
+    error (in chunk order) is raised once every chunk has finished.
+    """
+    with ThreadPoolExecutor(max_workers=max(min(max_workers, len(chunks)), 1)) as executor:
+        return list(executor.map(lambda numbered: synthesize(*numbered), enumerate(chunks)))
+
+def stitch(segments, crossfade_ms=CROSSFADE_MS):
+    """Joins chunk audio in order, overlapping neighbours with short linear crossfades."""
+    from numpy_mixer import make_layer, mix_segments
+
+    if len(segments) == 1:
+        return segments[0]
+    durations = [segment.frame_count() * 1000 / segment.frame_rate for segment in segments]
+    # One overlap per boundary, never more than half of either neighbour
+    overlaps = [min(crossfade_ms, durations[i] / 2, durations[i + 1] / 2) for i in range(len(segments) - 1)]
+
+    layers = []
+    offset_ms = 0
+    for i, segment in enumerate(segments):
+        fade_in_ms = overlaps[i - 1] if i else 0
+        fade_out_ms = overlaps[i] if i < len(overlaps) else 0
+        layers.append(make_layer(segment, offset_ms=offset_ms, fade_in_ms=fade_in_ms, fade_out_ms=fade_out_ms))
+        offset_ms += durations[i] - fade_out_ms
+    return mix_segments(layers, limit=False)
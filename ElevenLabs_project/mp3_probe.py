@@ -0,0 +1,291 @@
+# mp3_probe.py
+
+import json
+import os
+import struct
+import tempfile
+import threading
+from asset_store import ASSET_STORE_DIR, get_store
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+METADATA_INDEX_FILE = os.path.join(ASSET_STORE_DIR, "metadata.json")
+METADATA_VERSION = 1
+PROBE_HEAD_BYTES = 64 * 1024  # ID3v2 tags with cover art are skipped with a seek, not read
+
+# MPEG audio header tables (version: 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5; layer: 3 = I, 2 = II, 1 = III)
+BITRATES_KBPS = {
+    (3, 3): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (3, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (3, 1): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 3): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 1): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+# -------------------------------------------------------------
+# 2. THE PROBE (Frame Headers, Xing/Info/VBRI, ID3)
+
+def parse_frame_header(header):
+    """Decodes a 4-byte MPEG audio frame header. Returns a dict, or None if it is not one."""
+    if len(header) < 4:
+        return None
+    (word,) = struct.unpack(">I", header[:4])
+    if word >> 21 != 0x7FF:
+        return None
+    version = (word >> 19) & 0x3
+    layer = (word >> 17) & 0x3
+    bitrate_index = (word >> 12) & 0xF
+    rate_index = (word >> 10) & 0x3
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # Reserved values, or "free format" (no fixed frame size)
+
+    bitrate = BITRATES_KBPS[(3 if version == 3 else 2, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (word >> 9) & 0x1
+    channels = 1 if (word >> 6) & 0x3 == 3 else 2
+
+    if layer == 3:  # Layer I
+        samples_per_frame = 384
+        frame_bytes = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 3:  # Layer II, or Layer III in MPEG1
+        samples_per_frame = 1152
+        frame_bytes = 144 * bitrate // sample_rate + padding
+    else:  # Layer III in MPEG2/2.5
+        samples_per_frame = 576
+        frame_bytes = 72 * bitrate // sample_rate + padding
+    return {"version": version, "layer": 4 - layer, "bitrate": bitrate, "sample_rate": sample_rate,
+            "channels": channels, "samples_per_frame": samples_per_frame, "frame_bytes": frame_bytes}
+
+def _id3v2_size(head):
+    """Bytes taken by a leading ID3v2 tag (0 if there is none)."""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in head[6:10]:  # Syncsafe integer: 7 bits per byte
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _id3v2_title(tag):
+    """TIT2 from an ID3v2.3/2.4 tag (no unsynchronisation or extended header), or None."""
+    if len(tag) < 10 or tag[3] not in (3, 4) or tag[5] & 0xC0:
+        return None
+    position = 10
+    while position + 10 <= len(tag):
+        frame_id = tag[position:position + 4]
+        if not frame_id.strip(b"\x00"):
+            break  # Padding
+        raw_size = tag[position + 4:position + 8]
+        if tag[3] == 4:
+            size = 0
+            for byte in raw_size:
+                size = (size << 7) | (byte & 0x7F)
+        else:
+            (size,) = struct.unpack(">I", raw_size)
+        body = tag[position + 10:position + 10 + size]
+        if frame_id == b"TIT2" and body:
+            encoding = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}.get(body[0], "latin-1")
+            return body[1:].decode(encoding, errors="replace").strip("\x00").strip() or None
+        position += 10 + size
+    return None
+
+def _find_first_frame(data, start):
+    """Offset of the first frame header that is followed by another valid header."""
+    position = data.find(b"\xff", start)
+    while 0 <= position < len(data) - 4:
+        frame = parse_frame_header(data[position:position + 4])
+        if frame:
+            following = data[position + frame["frame_bytes"]:position + frame["frame_bytes"] + 4]
+            if len(following) < 4 or parse_frame_header(following):
+                return position, frame
+        position = data.find(b"\xff", position + 1)
+    return None, None
+
+def _vbr_header(data, offset, frame):
+    """
+    Reads a Xing/Info or VBRI header from the first frame. Returns (total
+    frames, encoder delay + padding in samples, is VBR), or None if absent.
+    """
+    if frame["version"] == 3:
+        side_info = 17 if frame["channels"] == 1 else 32
+    else:
+        side_info = 9 if frame["channels"] == 1 else 17
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        (flags,) = struct.unpack(">I", data[xing + 4:xing + 8])
+        if not flags & 0x1:
+            return None
+        (frames,) = struct.unpack(">I", data[xing + 8:xing + 12])
+        # LAME tag (gapless info) follows the optional bytes/TOC/quality fields
+        lame = xing + 12 + (4 if flags & 0x2 else 0) + (100 if flags & 0x4 else 0) + (4 if flags & 0x8 else 0)
+        trim = 0
+        if data[lame:lame + 4] in (b"LAME", b"Lavc", b"Lavf"):
+            delay_padding = data[lame + 21:lame + 24]
+            if len(delay_padding) == 3:
+                packed = int.from_bytes(delay_padding, "big")
+                trim = (packed >> 12) + (packed & 0xFFF)
+        return frames, trim, data[xing:xing + 4] == b"Xing"  # "Info" marks a CBR file
+
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        (frames,) = struct.unpack(">I", data[vbri + 14:vbri + 18])
+        return frames, 0, True
+    return None
+
+def probe_mp3(path):
+    """
+    Reads duration, sample rate, channels and bitrate of an MP3 from its
+    headers only (ID3v2 skipped, Xing/Info/VBRI used when present, CBR
+    otherwise). Returns a dict, or None if the file is not MPEG audio.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(PROBE_HEAD_BYTES)
+        audio_start = _id3v2_size(head)
+        title = _id3v2_title(head[:audio_start]) if audio_start else None
+        base = 0  # File offset of head[0]
+        if audio_start > len(head) - 4:
+            f.seek(audio_start)  # Large tag (cover art): skip it rather than read it
+            head, base = f.read(PROBE_HEAD_BYTES), audio_start
+        f.seek(max(file_size - 128, 0))
+        tail = f.read(128)
+
+    position, frame = _find_first_frame(head, audio_start - base)
+    if frame is None:
+        return None
+    offset = base + position
+    audio_end = file_size
+    if tail[:3] == b"TAG":
+        audio_end -= 128  # ID3v1
+        title = title or tail[3:33].decode("latin-1").strip("\x00 ") or None
+
+    vbr = _vbr_header(head, position, frame)
+    if vbr:
+        frames, trim, is_vbr = vbr
+        samples = max(frames * frame["samples_per_frame"] - trim, 0)
+        duration = samples / frame["sample_rate"]
+        # The Xing frame itself carries no audio
+        audio_bytes = audio_end - offset - frame["frame_bytes"]
+        if is_vbr or not duration:
+            bitrate = int(audio_bytes * 8 / duration) if duration else frame["bitrate"]
+        else:
+            # The Info frame may be written at another bitrate than the audio frames after it
+            following = parse_frame_header(head[position + frame["frame_bytes"]:position + frame["frame_bytes"] + 4])
+            bitrate = following["bitrate"] if following else frame["bitrate"]
+    else:
+        duration = (audio_end - offset) * 8 / frame["bitrate"]
+        bitrate = frame["bitrate"]
+        is_vbr = False
+
+    return {
+        "duration": duration,
+        "sample_rate": frame["sample_rate"],
+        "channels": frame["channels"],
+        "bitrate": bitrate,
+        "vbr": is_vbr,
+        "layer": frame["layer"],
+        "title": title,
+        "size": file_size,
+    }
+
+# -------------------------------------------------------------
+# 3. THE METADATA INDEX (Persisted, Keyed by Content Hash)
+
+class MetadataIndex:
+    """
+    Probe results for every asset, keyed on the asset store's content hash
+    and saved as JSON, so durations and formats are dictionary lookups.
+    A file is only probed again when its content changes (identical copies
+    share one entry).
+    """
+
+    def __init__(self, path=METADATA_INDEX_FILE, asset_store=None):
+        self.path = path
+        self.asset_store = asset_store
+        self._entries = None  # digest -> probe dict (None: not MPEG audio)
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _loaded(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._entries = data["assets"] if data.get("version") == METADATA_VERSION else {}
+            except (OSError, ValueError, KeyError):
+                self._entries = {}
+        return self._entries
+
+    def _lookup(self, path, digest=None):
+        digest = digest or (self.asset_store or get_store()).digest(path)
+        if digest is None:
+            return None
+        with self._lock:
+            entries = self._loaded()
+            if digest not in entries:
+                try:
+                    entries[digest] = probe_mp3(path)
+                except OSError:
+                    return None
+                self._dirty = True
+            return entries[digest]
+
+    def get(self, path):
+        """Metadata for the file at path (probing it on first sight), or None."""
+        metadata = self._lookup(path)
+        self.save()
+        return metadata
+
+    def duration(self, path):
+        """Duration in seconds (None if unknown)."""
+        metadata = self.get(path)
+        return metadata["duration"] if metadata else None
+
+    def cached(self, path):
+        """Metadata for path if it is already indexed, else None. Never hashes or probes."""
+        digest = (self.asset_store or get_store()).known_digest(path)
+        if digest is None:
+            return None
+        with self._lock:
+            return self._loaded().get(digest)
+
+    def build(self, paths):
+        """Indexes every path in one go (one asset-index and one metadata save)."""
+        digests = (self.asset_store or get_store()).digests(paths)
+        metadata = {path: self._lookup(path, digest) if digest else None for path, digest in digests.items()}
+        self.save()
+        return metadata
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            tmp_path = None
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": METADATA_VERSION, "assets": self._entries}, f, indent=1)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                print(f"⚠️ Warning: Could not save the asset metadata index: {e}")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """Returns the shared MetadataIndex (created on first use)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MetadataIndex()
+    return _index
@@ -0,0 +1,160 @@
+# music_library.py
+
+import csv
+import os
+import threading
+from asset_store import get_store
+from audio_formats import MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH
+from mp3_probe import get_index
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+MUSIC_LIBRARY_CSV = os.path.join(PROJECT_DIR, "music_library.csv")
+MUSIC_DIRS = [os.path.join(PROJECT_DIR, "music"), PROJECT_DIR]  # Searched in order
+MUSIC_MIXER_CHANNEL = 0  # Reserved mixer channel for the background score
+
+# -------------------------------------------------------------
+# 2. THE INDEX (O(1) Lookup by Scene Name and Id)
+
+def resolve_music_path(filename):
+    """Returns the first existing path for filename in MUSIC_DIRS, or None."""
+    for music_dir in MUSIC_DIRS:
+        path = os.path.join(music_dir, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class MusicLibrary:
+    """
+    Index over music_library.csv. Each track is a dict with the CSV columns
+    plus the resolved 'path' (None when the file is missing). Decoding goes
+    through the asset store, so tracks with identical content share one stem.
+    """
+
+    def __init__(self, csv_path=MUSIC_LIBRARY_CSV, asset_store=None):
+        self.tracks = []
+        self.asset_store = asset_store
+        self._by_name = {}
+        self._by_id = {}
+        self._stems = {}  # scene_name -> decoded PCM bytes (mixer format)
+        self._decoded = {}  # asset digest -> decoded PCM bytes, shared by identical tracks
+        self._sounds = {}  # asset digest -> pygame Sound built from the stem
+        self._prewarm_thread = None
+
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                track = dict(row)
+                track["id"] = int(track["id"])
+                track["path"] = resolve_music_path(track["filename"])
+                self.tracks.append(track)
+                self._by_name[track["scene_name"]] = track
+                self._by_id[track["id"]] = track
+
+    def by_name(self, scene_name):
+        return self._by_name.get(scene_name)
+
+    def by_id(self, track_id):
+        return self._by_id.get(int(track_id))
+
+    def duration(self, scene_name):
+        """Track length in seconds from the metadata index (no decode), or None."""
+        track = self.by_name(scene_name)
+        if track is None or not track["path"]:
+            return None
+        return get_index().duration(track["path"])
+
+    # ---------------------------------------------------------
+    # 3. BACKGROUND PREWARM (Decode Off the Critical Path)
+
+    def prewarm(self, scene_names=None):
+        """Starts decoding every available track (or just scene_names) on a background thread."""
+        if self._prewarm_thread is None:
+            self._prewarm_thread = threading.Thread(target=self._decode_all, args=(scene_names,),
+                                                    daemon=True)
+            self._prewarm_thread.start()
+        return self._prewarm_thread
+
+    def _decode(self, track):
+        from pydub import AudioSegment  # Only needed once stems are decoded
+
+        digest, asset_path = (self.asset_store or get_store()).resolve(track["path"])
+        if digest is None:
+            raise FileNotFoundError(f"Music file not found: {track['path']}")
+        track["asset"] = digest
+        pcm = self._decoded.get(digest)
+        if pcm is None:
+            pcm = (AudioSegment.from_file(asset_path)
+                               .set_frame_rate(MIXER_FREQUENCY)
+                               .set_channels(MIXER_CHANNELS)
+                               .set_sample_width(MIXER_SAMPLE_WIDTH)).raw_data
+            self._decoded[digest] = pcm
+        self._stems[track["scene_name"]] = pcm
+        return pcm
+
+    def _decode_all(self, scene_names=None):
+        for track in self.tracks:
+            if not track["path"] or (scene_names and track["scene_name"] not in scene_names):
+                continue
+            try:
+                self._decode(track)
+            except Exception as e:
+                print(f"⚠️ Warning: Could not prewarm music file '{track['path']}': {e}")
+
+    def is_ready(self, scene_name):
+        return scene_name in self._stems
+
+    def get_stem(self, scene_name):
+        """
+        Returns a track's PCM (mixer format) for offline rendering, decoding it
+        now if prewarm() has not got to it yet. None if the file is missing.
+        """
+        stem = self._stems.get(scene_name)
+        if stem is None and self._prewarm_thread is not None:
+            self._prewarm_thread.join()  # Already being decoded in the background
+            stem = self._stems.get(scene_name)
+        if stem is None:
+            track = self.by_name(scene_name)
+            if track is None or not track["path"]:
+                return None
+            stem = self._decode(track)
+        return stem
+
+    def get_sound(self, scene_name):
+        """Returns a pygame Sound for a prewarmed track, or None if not decoded yet."""
+        import pygame  # Only needed for playback
+
+        if scene_name not in self._stems:
+            return None
+        digest = self.by_name(scene_name)["asset"]
+        sound = self._sounds.get(digest)
+        if sound is None:
+            sound = pygame.mixer.Sound(buffer=self._stems[scene_name])
+            self._sounds[digest] = sound
+        return sound
+
+    def play(self, scene_name, loops=0):
+        """
+        Plays a track: from the prewarmed stem when ready, otherwise via
+        pygame.mixer.music streaming from disk. Returns True if it started.
+        """
+        import pygame
+
+        track = self.by_name(scene_name)
+        if track is None or not track["path"]:
+            return False
+
+        sound = self.get_sound(scene_name)
+        if sound is not None:
+            # Keep the score channel out of Sound.play()'s free-channel search
+            pygame.mixer.set_reserved(MUSIC_MIXER_CHANNEL + 1)
+            pygame.mixer.music.stop()
+            pygame.mixer.Channel(MUSIC_MIXER_CHANNEL).play(sound, loops=loops)
+            return True
+
+        pygame.mixer.Channel(MUSIC_MIXER_CHANNEL).stop()
+        pygame.mixer.music.load(track["path"])
+        pygame.mixer.music.play(loops=loops)
+        return True
@@ -0,0 +1,212 @@
+# numpy_mixer.py
+
+import numpy as np
+from audio_formats import MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+INT16_SCALE = 32768.0
+LIMITER_THRESHOLD = 0.9  # Peaks above this are soft-limited into the remaining headroom
+MIX_BLOCK_FRAMES = 65536  # int16 layers are scaled to float32 this many frames at a time
+
+# -------------------------------------------------------------
+# 2. CONVERSION (AudioSegment <-> float32 arrays)
+
+def segment_to_array(segment):
+    """Returns a float32 array of shape (frames, MIXER_CHANNELS) in [-1, 1]."""
+    if segment.frame_rate != MIXER_FREQUENCY:
+        segment = segment.set_frame_rate(MIXER_FREQUENCY)
+    if segment.channels != MIXER_CHANNELS:
+        segment = segment.set_channels(MIXER_CHANNELS)
+    if segment.sample_width != MIXER_SAMPLE_WIDTH:
+        segment = segment.set_sample_width(MIXER_SAMPLE_WIDTH)
+    samples = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, MIXER_CHANNELS)
+    return np.multiply(samples, 1.0 / INT16_SCALE, dtype=np.float32)  # Convert and scale in one pass
+
+def as_float_array(samples):
+    """Accepts an AudioSegment, or an int16/float32 array (mono or (frames, channels))."""
+    if not isinstance(samples, np.ndarray):
+        return segment_to_array(samples)
+    if samples.dtype == np.int16:
+        samples = np.multiply(samples, 1.0 / INT16_SCALE, dtype=np.float32)
+    else:
+        samples = samples.astype(np.float32, copy=False)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if samples.shape[1] != MIXER_CHANNELS:
+        samples = np.repeat(samples[:, :1], MIXER_CHANNELS, axis=1)  # Mono (or first channel) to all
+    return samples
+
+def as_mix_array(samples):
+    """
+    as_float_array(), except that an int16 (frames, MIXER_CHANNELS) array is
+    kept as it is: the mixer scales it block by block, so a turn held in the
+    scratch store is never copied whole onto the heap.
+    """
+    if (isinstance(samples, np.ndarray) and samples.dtype == np.int16
+            and samples.ndim == 2 and samples.shape[1] == MIXER_CHANNELS):
+        return samples
+    return as_float_array(samples)
+
+def array_to_int16(samples):
+    """float32 [-1, 1] -> interleaved int16, hard-clipped as a last resort."""
+    scaled = np.multiply(samples, INT16_SCALE, dtype=np.float32)
+    np.clip(scaled, -INT16_SCALE, INT16_SCALE - 1, out=scaled)
+    return scaled.astype(np.int16)
+
+def array_to_segment(samples):
+    from pydub import AudioSegment
+
+    return AudioSegment(
+        data=array_to_int16(samples).tobytes(),
+        sample_width=MIXER_SAMPLE_WIDTH,
+        frame_rate=MIXER_FREQUENCY,
+        channels=MIXER_CHANNELS,
+    )
+
+# -------------------------------------------------------------
+# 3. THE MIXER (Layers with Offset, Gain and Fades)
+
+def make_layer(samples, offset_ms=0, gain_db=0.0, fade_in_ms=0, fade_out_ms=0):
+    """
+    Describes one layer of a mix: dialogue, an SFX placement, a music bed...
+    samples may be an AudioSegment or an int16/float32 NumPy array (stereo
+    int16 is mixed from as it is, anything else is converted to float32).
+    """
+    return {
+        "samples": as_mix_array(samples),
+        "offset_ms": offset_ms,
+        "gain_db": gain_db,
+        "fade_in_ms": fade_in_ms,
+        "fade_out_ms": fade_out_ms,
+    }
+
+def ms_to_frames(ms, frame_rate=MIXER_FREQUENCY):
+    return int(round(ms * frame_rate / 1000))
+
+def layer_envelope(frames, gain_db, fade_in_frames, fade_out_frames, start=0, stop=None):
+    """
+    Per-frame gain for a layer: constant gain with linear fade-in/out ramps.
+    Only frames [start, stop) of the envelope are computed and returned.
+    """
+    stop = frames if stop is None else stop
+    envelope = np.full(stop - start, 10 ** (gain_db / 20), dtype=np.float32)
+    fade_in_frames = min(fade_in_frames, frames)
+    fade_out_frames = min(fade_out_frames, frames)
+    if fade_in_frames and start < fade_in_frames:
+        end = min(stop, fade_in_frames)
+        envelope[:end - start] *= np.arange(start, end, dtype=np.float32) / max(fade_in_frames - 1, 1)
+    fade_out_start = frames - fade_out_frames
+    if fade_out_frames and stop > fade_out_start:
+        begin = max(start, fade_out_start)
+        ramp = np.arange(begin - fade_out_start, stop - fade_out_start, dtype=np.float32)
+        envelope[begin - start:] *= 1.0 - ramp / max(fade_out_frames - 1, 1)
+    return envelope
+
+def soft_limit(mix, threshold=LIMITER_THRESHOLD):
+    """
+    Clipping protection: samples under threshold pass untouched, anything
+    louder is bent with tanh into the headroom left below full scale.
+    Works in place and returns mix.
+    """
+    over = np.abs(mix) > threshold
+    if over.any():
+        headroom = 1.0 - threshold
+        loud = mix[over]
+        mix[over] = np.sign(loud) * (threshold + headroom * np.tanh((np.abs(loud) - threshold) / headroom))
+    return mix
+
+def layer_frames(layers):
+    """Frames needed to hold every layer at its offset."""
+    return max([ms_to_frames(layer["offset_ms"]) + len(layer["samples"]) for layer in layers] or [0])
+
+def add_layer(mix, layer, mix_start=0):
+    """
+    Adds the part of a layer that falls inside mix (a float32 block that
+    starts at frame mix_start of the scene), MIX_BLOCK_FRAMES at a time.
+    int16 samples are scaled through the envelope, never copied whole.
+    """
+    samples = layer["samples"]
+    frames = len(samples)
+    layer_start = ms_to_frames(layer["offset_ms"])
+    first = max(mix_start - layer_start, 0)
+    last = min(mix_start + len(mix) - layer_start, frames)
+    scale = np.float32(1.0 / INT16_SCALE) if samples.dtype == np.int16 else None
+    fade_in_frames = ms_to_frames(layer["fade_in_ms"])
+    fade_out_frames = ms_to_frames(layer["fade_out_ms"])
+    for block in range(first, last, MIX_BLOCK_FRAMES):
+        block_end = min(block + MIX_BLOCK_FRAMES, last)
+        envelope = layer_envelope(frames, layer["gain_db"], fade_in_frames, fade_out_frames, block, block_end)
+        if scale is not None:
+            envelope *= scale
+        offset = layer_start + block - mix_start
+        mix[offset:offset + block_end - block] += samples[block:block_end] * envelope[:, None]
+
+def mix_layer_blocks(layers, total_frames, block_frames=MIX_BLOCK_FRAMES):
+    """
+    Yields (start frame, unlimited float32 block) covering [0, total_frames),
+    each holding the layers that overlap it. Only one block of the mix is
+    ever allocated at a time.
+    """
+    pending = sorted(layers, key=lambda layer: layer["offset_ms"])
+    active = []
+    index = 0
+    for start in range(0, total_frames, block_frames):
+        stop = min(start + block_frames, total_frames)
+        while index < len(pending) and ms_to_frames(pending[index]["offset_ms"]) < stop:
+            active.append(pending[index])
+            index += 1
+        active = [layer for layer in active
+                  if ms_to_frames(layer["offset_ms"]) + len(layer["samples"]) > start]
+        block = np.zeros((stop - start, MIXER_CHANNELS), dtype=np.float32)
+        for layer in active:
+            add_layer(block, layer, start)
+        yield start, block
+
+def mix_layers(layers, length_ms=None, limit=True):
+    """
+    Sums any number of layers into one float32 (frames, MIXER_CHANNELS) array.
+    Each layer is placed at its offset with its own gain and fades; the
+    scene is as long as the longest layer unless length_ms is given.
+    """
+    total_frames = layer_frames(layers) if length_ms is None else ms_to_frames(length_ms)
+    mix = np.zeros((total_frames, MIXER_CHANNELS), dtype=np.float32)
+    for layer in layers:
+        add_layer(mix, layer)
+    return soft_limit(mix) if limit else mix
+
+def mix_segments(layers, length_ms=None, limit=True):
+    """mix_layers() returning an AudioSegment in the mix format."""
+    return array_to_segment(mix_layers(layers, length_ms=length_ms, limit=limit))
+
+# -------------------------------------------------------------
+# 4. DRAFT MIXING (Mono, Reduced Rate, for Quick Previews)
+
+def downmix_decimate(samples, factor):
+    """
+    Draft copy of a layer: mono at 1/factor of the frame rate, by averaging
+    blocks of `factor` frames (a cheap low-pass). Accepts what make_layer()
+    does; int16 input is averaged without a full-rate float copy.
+    Returns a 1-D float32 array in [-1, 1].
+    """
+    if not isinstance(samples, np.ndarray):
+        samples = segment_to_array(samples)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    frames = len(samples) // factor * factor
+    blocks = samples[:frames].reshape(-1, factor * samples.shape[1])
+    # Summing strided columns is several times faster than mean(axis=1) over short rows
+    draft = blocks[:, 0].astype(np.float32)
+    for column in range(1, blocks.shape[1]):
+        draft += blocks[:, column]
+    scale = (1.0 / INT16_SCALE if samples.dtype == np.int16 else 1.0) / blocks.shape[1]
+    draft *= np.float32(scale)
+    return draft
+
+def mix_draft(tracks, limit=True):
+    """Sums draft tracks [(1-D samples, gain_db), ...], all starting at 0, into one 1-D array."""
+    mix = np.zeros(max([len(samples) for samples, _ in tracks] or [0]), dtype=np.float32)
+    for samples, gain_db in tracks:
+        mix[:len(samples)] += samples * np.float32(10 ** (gain_db / 20))
+    return soft_limit(mix) if limit else mix
@@ -0,0 +1,111 @@
+# pipeline_metrics.py
+
+import contextlib
+import cProfile
+import json
+import pstats
+import threading
+import time
+
+# -------------------------------------------------------------
+# 1. THE REGISTRY (Per-run Aggregated Timing Spans)
+
+class PipelineMetrics:
+    """
+    Collects timing spans per pipeline stage ("api", "decode", "sfx_mix", ...)
+    and aggregates them for the whole run. Thread-safe, so batch workers
+    can record into the same registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []  # One dict per finished span
+        self._stages = {}  # stage -> {"count", "total", "min", "max"}
+
+    @contextlib.contextmanager
+    def span(self, stage, **labels):
+        """Times the enclosed block as one occurrence of stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **labels)
+
+    def record(self, stage, seconds, **labels):
+        with self._lock:
+            self._events.append({"stage": stage, "seconds": seconds, "ts": time.time(), **labels})
+            agg = self._stages.setdefault(stage, {"count": 0, "total": 0.0, "min": seconds, "max": seconds})
+            agg["count"] += 1
+            agg["total"] += seconds
+            agg["min"] = min(agg["min"], seconds)
+            agg["max"] = max(agg["max"], seconds)
+
+    def summary(self):
+        """Returns {stage: {"count", "total", "min", "max", "mean"}}."""
+        with self._lock:
+            return {stage: {**agg, "mean": agg["total"] / agg["count"]}
+                    for stage, agg in self._stages.items()}
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._stages.clear()
+
+    # ---------------------------------------------------------
+    # 2. MACHINE-READABLE DUMPS
+
+    def dump_jsonl(self, path):
+        """Appends every recorded span to path as JSON lines."""
+        with self._lock:
+            events = list(self._events)
+        with open(path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+    def prometheus_text(self, prefix="mythic_pipeline"):
+        """Returns a Prometheus text-format snapshot of the aggregated stages."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, agg in sorted(self.summary().items()):
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {agg["count"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {agg["total"]:.6f}')
+        lines.append(f"# HELP {prefix}_stage_seconds_max Slowest occurrence per stage.")
+        lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+        for stage, agg in sorted(self.summary().items()):
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{stage}"}} {agg["max"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print("\n⏱️ Pipeline timing (per stage):")
+        for stage, agg in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+            print(f"   {stage:<12} {agg['count']:>4}x  total {agg['total']:8.3f}s  "
+                  f"mean {agg['mean'] * 1000:8.1f}ms  max {agg['max'] * 1000:8.1f}ms")
+
+
+# Shared registry for the whole process
+metrics = PipelineMetrics()
+
+# -------------------------------------------------------------
+# 3. OPTIONAL PROFILER HOOK
+
+@contextlib.contextmanager
+def profile_session(output_path=None, top=25):
+    """
+    Runs the enclosed block under cProfile. Writes raw stats to output_path
+    (for snakeviz/pstats) when given, and prints the top cumulative entries.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output_path:
+            profiler.dump_stats(output_path)
+            print(f"🧪 Profile written to {output_path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
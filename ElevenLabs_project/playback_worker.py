@@ -0,0 +1,66 @@
+# playback_worker.py
+
+import queue
+import threading
+import time
+from pipeline_metrics import metrics
+
+# -------------------------------------------------------------
+# 1. THE WORKER (Review Playback Off the Main Thread)
+
+class PlaybackWorker:
+    """
+    Runs playback jobs one after another on a background thread, so the
+    main loop can prompt for (and synthesize) the next turn while the
+    current segment is still audible. Jobs play in submission order.
+    """
+
+    def __init__(self, poll_interval=0.02):
+        self.poll_interval = poll_interval
+        self._jobs = queue.Queue()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                job()
+            except Exception as e:
+                print(f"❌ Playback Error: {e}")
+            finally:
+                self._jobs.task_done()
+
+    def submit(self, job):
+        """Queues a callable to run on the playback thread."""
+        self._ensure_started()
+        self._jobs.put(job)
+
+    def submit_sound(self, sound, on_done=None, stage="playback"):
+        """Queues a pygame Sound; on_done (optional) runs once it has finished."""
+        def play_job():
+            with metrics.span(stage):
+                channel = sound.play()
+                while channel is not None and channel.get_busy():
+                    time.sleep(self.poll_interval)
+            if on_done:
+                on_done()
+        self.submit(play_job)
+
+    def wait_idle(self):
+        """Blocks until every queued job has finished playing."""
+        if self._thread is not None:
+            self._jobs.join()
+
+    def shutdown(self):
+        """Drains the queue and stops the playback thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join()
+        self._thread = None
@@ -0,0 +1,125 @@
+# progressive_export.py
+
+import os
+import queue
+import subprocess
+import threading
+from audio_formats import FINAL_BITRATE, FINAL_CODEC, LOSSLESS_CODECS, MIXER_CHANNELS, MIXER_FREQUENCY
+from stream_player import FFMPEG_BINARY
+
+# -------------------------------------------------------------
+# 2. THE EXPORTER (One Encoder Stream for the Whole Session)
+
+class ProgressiveExporter:
+    """
+    Keeps one ffmpeg encoder open on the output file for a whole session and
+    feeds it mixer-format PCM (s16le) as turns are finished, so the encode
+    runs alongside the session instead of after it. Writes happen on a
+    background thread; finalize() only flushes the last frames. The encoder
+    (and the output file) is only opened by the first append().
+
+    If the session dies, ffmpeg sees end of input (or the same Ctrl+C) and
+    closes the file properly, so whatever was appended is still playable.
+    With max_queued, append() waits once that many blocks are queued, so a
+    producer faster than the encoder holds a bounded amount of PCM.
+    """
+
+    def __init__(self, output_file, codec=FINAL_CODEC, bitrate=FINAL_BITRATE,
+                 frame_rate=MIXER_FREQUENCY, channels=MIXER_CHANNELS, max_queued=0):
+        self.output_file = output_file
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.bytes_written = 0
+        self._command = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                         "-f", "s16le", "-ar", str(frame_rate), "-ac", str(channels), "-i", "pipe:0"]
+        if bitrate and codec not in LOSSLESS_CODECS:
+            self._command += ["-b:a", bitrate]
+        self._command += ["-f", codec, output_file]
+        self._encoder = None
+        self._writer = None
+        self._errors = []
+        self._queue = queue.Queue(max_queued)
+        self._done = object()
+
+    def _start(self):
+        self._encoder = subprocess.Popen(self._command, stdin=subprocess.PIPE)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            pcm = self._queue.get()
+            if pcm is self._done:
+                break
+            if self._errors:
+                continue  # Encoder gone: drain the queue so finalize() does not hang
+            try:
+                self._encoder.stdin.write(pcm)
+                self.bytes_written += len(pcm)
+            except OSError as e:
+                self._errors.append(e)
+
+    def append(self, pcm):
+        """
+        Queues PCM (bytes or int16 array) for the encoder and returns
+        immediately. Raises OSError if the encoder cannot be started.
+        """
+        if not len(pcm):
+            return
+        if self._encoder is None:
+            self._start()
+        self._queue.put(pcm if isinstance(pcm, (bytes, bytearray)) else memoryview(pcm).cast("B"))
+
+    def duration_seconds(self):
+        return self.bytes_written / (self.frame_rate * self.channels * 2)
+
+    def finalize(self):
+        """Flushes the queue and closes the encoder. Returns True if the file was written."""
+        if self._encoder is None:
+            return False
+        self._queue.put(self._done)
+        self._writer.join()
+        try:
+            self._encoder.stdin.close()
+        except OSError as e:
+            self._errors.append(e)
+        return self._encoder.wait() == 0 and not self._errors
+
+    def abort(self):
+        """Stops the encoder and removes the unfinished file (nothing to do if never started)."""
+        if self._encoder is None:
+            return
+        self._queue.put(self._done)
+        self._encoder.kill()
+        self._writer.join()
+        self._encoder.wait()
+        try:
+            os.remove(self.output_file)
+        except OSError:
+            pass
+
+# -------------------------------------------------------------
+# 3. THE PROGRESSIVE SCENE (Mix + Encode as Turns Arrive)
+
+class ProgressiveScene:
+    """A ProgressiveTimeline feeding a ProgressiveExporter: each add_turn() is mixed and queued."""
+
+    def __init__(self, output_file, codec=FINAL_CODEC, bitrate=FINAL_BITRATE):
+        from timeline_renderer import ProgressiveTimeline
+
+        self.timeline = ProgressiveTimeline()
+        self.exporter = ProgressiveExporter(output_file, codec, bitrate)
+
+    def add_turn(self, dialogue, sfx=(), dialogue_gain_db=0.0):
+        from numpy_mixer import array_to_int16
+
+        self.exporter.append(array_to_int16(self.timeline.add_turn(dialogue, sfx, dialogue_gain_db)))
+
+    def finalize(self):
+        from numpy_mixer import array_to_int16
+
+        self.exporter.append(array_to_int16(self.timeline.flush()))
+        return self.exporter.finalize()
+
+    def abort(self):
+        self.exporter.abort()
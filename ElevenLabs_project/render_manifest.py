@@ -0,0 +1,138 @@
+# render_manifest.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from audio_formats import MIXER_CHANNELS, MIXER_SAMPLE_WIDTH
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+SEGMENT_DIR_SUFFIX = ".turns"  # Rendered turn PCM lives next to the output file
+SEGMENT_SUFFIX = ".pcm"
+
+# -------------------------------------------------------------
+# 2. CONTENT HASHES
+
+def content_hash(inputs):
+    """sha256 of a JSON-serializable description of a render's inputs."""
+    encoded = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# -------------------------------------------------------------
+# 3. THE MANIFEST (Incremental Scene Builds)
+
+class RenderManifest:
+    """
+    Build record for one output file: the content hash of every turn's
+    inputs, the rendered PCM of each turn (one file per hash) and the hash
+    of the whole scene. Turns whose hash is unchanged are loaded from disk
+    instead of being synthesized and decoded again; an unchanged scene is
+    not rendered at all.
+    """
+
+    def __init__(self, path, segment_dir):
+        self.path = path
+        self.segment_dir = segment_dir
+        self.turn_hashes = []
+        self.scene_hash = None
+        self.output = None
+        self.reused = 0
+        self.rendered = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def for_output(cls, output_file):
+        """The manifest and segment directory that belong to output_file."""
+        return cls(output_file + MANIFEST_SUFFIX, output_file + SEGMENT_DIR_SUFFIX)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return  # No previous build (or an unreadable one): render everything
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        self.turn_hashes = data.get("turns", [])
+        self.scene_hash = data.get("scene_hash")
+        self.output = data.get("output")
+
+    def is_current(self, scene_hash, output_file):
+        """True if output_file was built from exactly these inputs and still exists."""
+        return (scene_hash == self.scene_hash and output_file == self.output
+                and os.path.exists(output_file))
+
+    def _segment_path(self, turn_hash):
+        return os.path.join(self.segment_dir, turn_hash + SEGMENT_SUFFIX)
+
+    def load_turn(self, turn_hash):
+        """Returns the stored PCM for turn_hash, or None if it has to be rendered."""
+        try:
+            with open(self._segment_path(turn_hash), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) % (MIXER_SAMPLE_WIDTH * MIXER_CHANNELS):
+            # Truncated segment (e.g. a crash mid-copy): drop it and re-render
+            try:
+                os.remove(self._segment_path(turn_hash))
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self.reused += 1
+        return data
+
+    def store_turn(self, turn_hash, pcm):
+        try:
+            _atomic_write(self._segment_path(turn_hash), pcm)
+        except OSError as e:
+            print(f"⚠️ Warning: Could not store rendered turn: {e}")
+            return
+        with self._lock:
+            self.rendered += 1
+
+    def record(self, turn_hashes, scene_hash, output_file):
+        """Saves the build and removes segments no turn refers to any more."""
+        self.turn_hashes = list(turn_hashes)
+        self.scene_hash = scene_hash
+        self.output = output_file
+        data = {"version": MANIFEST_VERSION, "output": output_file,
+                "scene_hash": scene_hash, "turns": self.turn_hashes}
+        _atomic_write(self.path, json.dumps(data, indent=2).encode("utf-8"))
+        self.prune()
+
+    def prune(self):
+        keep = {turn_hash + SEGMENT_SUFFIX for turn_hash in self.turn_hashes}
+        try:
+            names = os.listdir(self.segment_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(SEGMENT_SUFFIX) and name not in keep:
+                try:
+                    os.remove(os.path.join(self.segment_dir, name))
+                except OSError:
+                    pass
@@ -0,0 +1,270 @@
+# request_scheduler.py
+
+import email.utils
+import itertools
+import os
+import random
+import threading
+import time
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION (Account Limits, override via .env)
+# Conservative defaults: set these to your plan's limits. They apply to the
+# whole process, so they also cap the engines' worker pools (V4 --workers).
+
+def _env_float(name, default=None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+REQUESTS_PER_SECOND = _env_float("ELEVENLABS_REQUESTS_PER_SECOND", 5.0)
+CHARACTERS_PER_SECOND = _env_float("ELEVENLABS_CHARACTERS_PER_SECOND")  # None = unlimited
+MAX_CONCURRENT_REQUESTS = int(_env_float("ELEVENLABS_MAX_CONCURRENT_REQUESTS", 4))
+CHARACTER_QUOTA = _env_float("ELEVENLABS_CHARACTER_QUOTA")  # None = not tracked against a limit
+MAX_RETRIES = 6
+BASE_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised instead of sending a request that would exceed CHARACTER_QUOTA."""
+
+# -------------------------------------------------------------
+# 2. TOKEN BUCKET
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0):
+        """Blocks until `amount` tokens are available, then takes them."""
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+# -------------------------------------------------------------
+# 3. THE SCHEDULER (Throttling, Retries, Quota Accounting)
+
+def retry_after_seconds(error):
+    """Returns the Retry-After delay carried by an API error, or None."""
+    headers = getattr(error, "headers", None) or {}
+    value = None
+    for name, header_value in headers.items():
+        if name.lower() == "retry-after":
+            value = header_value
+            break
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None  # Malformed header: the normal backoff applies
+    return max(retry_at.timestamp() - time.time(), 0.0) if retry_at else None
+
+def is_retryable(error):
+    """429s, 5xx and transport failures are retried; other client errors are not."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    try:
+        import httpx
+        if isinstance(error, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class RequestScheduler:
+    """
+    Sits in front of client.text_to_speech.convert(): paces requests and
+    characters with token buckets, bounds concurrency, retries transient
+    failures with jittered exponential backoff (honoring Retry-After), and
+    counts characters used against the account quota.
+    """
+
+    def __init__(self, requests_per_second=REQUESTS_PER_SECOND,
+                 characters_per_second=CHARACTERS_PER_SECOND,
+                 max_concurrent=MAX_CONCURRENT_REQUESTS, character_quota=CHARACTER_QUOTA,
+                 max_retries=MAX_RETRIES, base_backoff=BASE_BACKOFF_SECONDS,
+                 max_backoff=MAX_BACKOFF_SECONDS):
+        self.request_bucket = TokenBucket(requests_per_second) if requests_per_second else None
+        self.character_bucket = (TokenBucket(characters_per_second, characters_per_second * 10)
+                                 if characters_per_second else None)
+        self.max_concurrent = max_concurrent
+        self.concurrency = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self.character_quota = character_quota
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.characters_used = 0
+
+    def backoff_delay(self, attempt, error):
+        """Full-jitter exponential backoff, never shorter than Retry-After."""
+        ceiling = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        delay = self._random.uniform(0, ceiling)
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after + self._random.uniform(0, self.base_backoff))
+        return delay
+
+    def _check_quota(self, characters):
+        if self.character_quota is None:
+            return
+        with self._lock:
+            if self.characters_used + characters > self.character_quota:
+                raise QuotaExceededError(
+                    f"Character quota reached ({self.characters_used:.0f}/{self.character_quota:.0f})."
+                )
+
+    def convert(self, client, text, **kwargs):
+        """
+        Scheduled client.text_to_speech.convert(). The request is sent and its
+        first chunk received here, so HTTP errors are retried before any audio
+        reaches the caller. Returns an iterator over the audio chunks.
+        """
+        characters = len(text)
+        self._check_quota(characters)
+
+        for attempt in range(self.max_retries + 1):
+            if self.request_bucket:
+                self.request_bucket.acquire()
+            if self.character_bucket:
+                self.character_bucket.acquire(characters)
+            if self.concurrency:
+                self.concurrency.acquire()
+
+            with self._lock:
+                self.requests += 1
+            try:
+                chunks = iter(client.text_to_speech.convert(text=text, **kwargs))
+                first_chunk = next(chunks, b"")
+            except Exception as e:
+                if self.concurrency:
+                    self.concurrency.release()
+                with self._lock:
+                    self.throttled += getattr(e, "status_code", None) == 429
+                if not is_retryable(e) or attempt == self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                with self._lock:
+                    self.retries += 1
+                status = getattr(e, "status_code", type(e).__name__)
+                print(f"⏳ ElevenLabs request failed ({status}). "
+                      f"Retrying in {delay:.1f}s (attempt {attempt + 2}/{self.max_retries + 1})...")
+                time.sleep(delay)
+                continue
+
+            with self._lock:
+                self.characters_used += characters
+            release = self.concurrency.release if self.concurrency else None
+            return ScheduledStream(itertools.chain([first_chunk], chunks), release,
+                                   close=getattr(chunks, "close", None))
+
+
+class ScheduledStream:
+    """
+    The chunks of one scheduled response. Gives its concurrency slot back
+    exactly once: when exhausted, on an error, on close(), or when dropped
+    unread (a generator's finally would never run if it was never started).
+    """
+
+    def __init__(self, chunks, release=None, close=None):
+        self._chunks = chunks
+        self._release = release
+        self._close = close
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            if self._close:
+                self._close()  # Lets the HTTP response go
+        finally:
+            if self._release:
+                self._release()
+
+    def __del__(self):
+        self.close()
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "failures": self.failures,
+                "characters_used": self.characters_used,
+            }
+        if self.character_quota is not None:
+            stats["characters_remaining"] = max(self.character_quota - stats["characters_used"], 0)
+        return stats
+
+# -------------------------------------------------------------
+# 4. CLIENT WRAPPER (Drop-in for ElevenLabs in the Engines)
+
+class ScheduledClient:
+    """Wraps an ElevenLabs client so text_to_speech.convert() goes through a RequestScheduler."""
+
+    def __init__(self, client, scheduler=None):
+        self.client = client
+        self.scheduler = scheduler or RequestScheduler()
+        self.text_to_speech = _ScheduledTextToSpeech(self)
+
+    def __getattr__(self, name):
+        # Everything except text_to_speech is passed through to the real client
+        return getattr(self.client, name)
+
+
+class _ScheduledTextToSpeech:
+    def __init__(self, scheduled):
+        self._scheduled = scheduled
+
+    def convert(self, **kwargs):
+        return self._scheduled.scheduler.convert(self._scheduled.client, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._scheduled.client.text_to_speech, name)
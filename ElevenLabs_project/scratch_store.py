@@ -0,0 +1,86 @@
+# scratch_store.py
+
+import mmap
+import os
+import tempfile
+import threading
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+SCRATCH_DIR = os.getenv("SCRATCH_DIR") or None  # None: the system temp directory
+SCRATCH_FILE_BYTES = int(os.getenv("SCRATCH_FILE_BYTES", 256 * 1024 * 1024))  # ~25 min of mixer PCM per file
+
+# -------------------------------------------------------------
+# 2. THE STORE (Rendered Turns in Memory-mapped Scratch Files)
+
+class ScratchStore:
+    """
+    Append-only store for the PCM of rendered turns. Segments are packed
+    into sparse, memory-mapped scratch files (a new file is started when
+    one is full) and found through an offset index, so the audio lives in
+    the page cache instead of the Python heap and long scenes keep resident
+    memory flat. view() is zero-copy.
+
+    The files are anonymous temporary files (unlinked while open on POSIX,
+    delete-on-close elsewhere): concurrent sessions never collide and a
+    crash leaves nothing behind.
+    """
+
+    def __init__(self, directory=SCRATCH_DIR, file_bytes=SCRATCH_FILE_BYTES):
+        self.directory = directory
+        self.file_bytes = file_bytes
+        self._files = []  # [{"file", "map", "used"}]
+        self._index = []  # segment id -> (file number, offset, length)
+        self._lock = threading.Lock()
+
+    def _new_file(self, capacity):
+        scratch = tempfile.TemporaryFile(prefix="scratch_", suffix=".pcm", dir=self.directory)
+        scratch.truncate(capacity)  # Sparse: disk is only used as segments are written
+        entry = {"file": scratch, "map": mmap.mmap(scratch.fileno(), capacity), "used": 0}
+        self._files.append(entry)
+        return entry
+
+    def append(self, pcm):
+        """Copies pcm (any bytes-like object) into the store. Returns its segment id."""
+        data = memoryview(pcm).cast("B")
+        length = len(data)
+        with self._lock:
+            current = self._files[-1] if self._files else None
+            if current is None or current["used"] + length > len(current["map"]):
+                # Mapped files never grow (views stay valid); an oversized segment gets its own file
+                current = self._new_file(max(self.file_bytes, length, 1))
+            offset = current["used"]
+            current["map"][offset:offset + length] = data
+            current["used"] += length
+            self._index.append((len(self._files) - 1, offset, length))
+            return len(self._index) - 1
+
+    def view(self, segment_id):
+        """Zero-copy memoryview of a stored segment."""
+        file_number, offset, length = self._index[segment_id]
+        return memoryview(self._files[file_number]["map"])[offset:offset + length]
+
+    def __len__(self):
+        return len(self._index)
+
+    def bytes_used(self):
+        return sum(length for _, _, length in self._index)
+
+    def close(self):
+        """Drops every segment and removes the scratch files."""
+        with self._lock:
+            for entry in self._files:
+                try:
+                    entry["map"].close()
+                except BufferError:
+                    pass  # A view is still alive; the mapping goes when it does
+                entry["file"].close()
+            self._files = []
+            self._index = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,133 @@
+# sfx_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from audio_db import SOUND_EFFECTS
+from asset_store import get_store
+from audio_formats import MIXER_CHANNELS, MIXER_FREQUENCY, MIXER_SAMPLE_WIDTH
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+SFX_CACHE_MAX_BYTES = int(os.getenv("SFX_CACHE_MAX_BYTES", 64 * 1024 * 1024))  # 64 MB of PCM
+
+# -------------------------------------------------------------
+# 2. THE CACHE (Decode Each Effect Once)
+
+class SfxCache:
+    """
+    Decoded sound effects from audio_db.SOUND_EFFECTS, converted once to the
+    mixer format and kept under a byte budget with LRU eviction.
+    Files are resolved through the asset store and cached per content hash,
+    so effects that share a file (or identical copies of one) share a decode.
+    get_segment() serves pydub mixing, get_sound() serves pygame playback.
+    """
+
+    def __init__(self, sound_effects=SOUND_EFFECTS, max_bytes=SFX_CACHE_MAX_BYTES, asset_store=None):
+        self.sound_effects = sound_effects
+        self.max_bytes = max_bytes
+        self.asset_store = asset_store
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # asset digest -> {"segment", "sound", "drafts", "bytes"}
+        self._assets = {}  # sfx_key -> (digest, object path)
+        self._lock = threading.Lock()
+
+    def _resolve(self, sfx_key):
+        """(digest, object path) of an effect's file, or (None, None) if it has none."""
+        asset = self._assets.get(sfx_key)
+        if asset is None:
+            sfx_path = self.sound_effects[sfx_key]['file_path']
+            if not sfx_path:
+                return None, None
+            asset = (self.asset_store or get_store()).resolve(sfx_path)
+            if asset[0] is None:
+                raise FileNotFoundError(f"Sound effect file not found: {sfx_path}")
+            self._assets[sfx_key] = asset
+        return asset
+
+    def _decode(self, asset_path):
+        from pydub import AudioSegment  # Only needed once an effect is decoded
+
+        segment = AudioSegment.from_file(asset_path)
+        return (segment.set_frame_rate(MIXER_FREQUENCY)
+                       .set_channels(MIXER_CHANNELS)
+                       .set_sample_width(MIXER_SAMPLE_WIDTH))
+
+    def _entry(self, sfx_key):
+        """Returns the cache entry for sfx_key, decoding it on a miss (lock held)."""
+        digest, asset_path = self._resolve(sfx_key)
+        if digest is None:
+            return None
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self._entries.move_to_end(digest)
+            return entry
+
+        segment = self._decode(asset_path)
+        entry = {"segment": segment, "sound": None, "bytes": len(segment.raw_data)}
+        self._entries[digest] = entry
+        self.current_bytes += entry["bytes"]
+        self._evict()
+        return entry
+
+    def _evict(self):
+        # Never evict the entry that was just used (the last one)
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.current_bytes -= old["bytes"]
+
+    def get_segment(self, sfx_key):
+        """Returns the decoded AudioSegment for sfx_key (None if it has no file)."""
+        with self._lock:
+            entry = self._entry(sfx_key)
+            return entry["segment"] if entry else None
+
+    def get_array(self, sfx_key):
+        """
+        The cached PCM of an effect as a read-only int16 (frames, MIXER_CHANNELS)
+        view (None if it has no file). No copy: every turn that uses the effect
+        mixes from the same samples, as dialogue mixes from the scratch store.
+        """
+        import numpy as np
+
+        with self._lock:
+            entry = self._entry(sfx_key)
+            if entry is None:
+                return None
+            if "array" not in entry:
+                entry["array"] = np.frombuffer(entry["segment"].raw_data, dtype=np.int16).reshape(-1, MIXER_CHANNELS)
+            return entry["array"]
+
+    def get_draft(self, sfx_key, factor):
+        """Mono float32 copy of an effect at 1/factor of the mixer rate, for draft previews (None if no file)."""
+        from numpy_mixer import downmix_decimate
+
+        with self._lock:
+            entry = self._entry(sfx_key)
+            if entry is None:
+                return None
+            drafts = entry.setdefault("drafts", {})
+            if factor not in drafts:
+                drafts[factor] = downmix_decimate(entry["segment"], factor)
+                entry["bytes"] += drafts[factor].nbytes
+                self.current_bytes += drafts[factor].nbytes
+                self._evict()
+            return drafts[factor]
+
+    def get_sound(self, sfx_key):
+        """Returns a pygame Sound for sfx_key built from the cached PCM (None if it has no file)."""
+        import pygame  # Only needed for playback
+
+        with self._lock:
+            entry = self._entry(sfx_key)
+            if entry is None:
+                return None
+            if entry["sound"] is None:
+                entry["sound"] = pygame.mixer.Sound(buffer=entry["segment"].raw_data)
+                # The Sound holds its own copy of the samples (drafts already counted)
+                sound_bytes = len(entry["segment"].raw_data)
+                entry["bytes"] += sound_bytes
+                self.current_bytes += sound_bytes
+                self._evict()
+            return entry["sound"]
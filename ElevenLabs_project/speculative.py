@@ -0,0 +1,147 @@
+# speculative.py
+
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+USAGE_STATS_FILE = os.getenv("AUTOMATOR_USAGE_FILE", ".automator_usage.json")
+USAGE_HISTORY = 100  # Most recent selections kept
+USAGE_DECAY = 0.85  # Weight of a selection made n turns ago: USAGE_DECAY ** n
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", 2))  # Combinations synthesized ahead
+
+# -------------------------------------------------------------
+# 2. USAGE STATISTICS (Which Voice/Mood Comes Next?)
+
+class UsageStats:
+    """
+    Recent voice/mood selections, persisted between sessions. rank() scores
+    each combination by recency-weighted frequency, so both habits and the
+    current scene's pattern count.
+    """
+
+    def __init__(self, path=USAGE_STATS_FILE, history=USAGE_HISTORY, decay=USAGE_DECAY):
+        self.path = path
+        self.history = history
+        self.decay = decay
+        self._selections = []  # [voice_key, mood_key], oldest first
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._selections = [list(pair) for pair in json.load(f).get("selections", [])][-history:]
+        except (OSError, ValueError, TypeError):
+            pass  # No history yet: nothing is speculated until a selection is made
+
+    def record(self, voice_key, mood_key):
+        with self._lock:
+            self._selections = (self._selections + [[voice_key, mood_key]])[-self.history:]
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"selections": self._selections}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            print(f"⚠️ Warning: Could not save usage statistics: {e}")
+
+    def rank(self, limit=SPECULATIVE_CANDIDATES, allowed=None):
+        """
+        The `limit` most likely (voice_key, mood_key) pairs, best first.
+        allowed(voice_key, mood_key) filters out pairs that cannot be used.
+        """
+        scores = {}
+        with self._lock:
+            selections = list(self._selections)
+        for age, (voice_key, mood_key) in enumerate(reversed(selections)):
+            pair = (voice_key, mood_key)
+            scores[pair] = scores.get(pair, 0.0) + self.decay ** age
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        if allowed is not None:
+            ranked = [pair for pair in ranked if allowed(*pair)]
+        return ranked[:limit]
+
+# -------------------------------------------------------------
+# 3. THE SPECULATOR (Synthesize While the User Is Choosing)
+
+class SpeculativeSynthesizer:
+    """
+    Runs prefetch(dialogue, voice_key, mood_key, cancelled) for the likely
+    combinations as soon as a line is typed. prefetch should warm whatever
+    the real render reads from (the synthesis cache) and stop early once
+    the `cancelled` event is set, returning True if it completed.
+
+    resolve() is called with the actual selection: a matching prefetch is
+    waited for (it is usually done or nearly done), every other one is
+    cancelled. Selections that are never speculated (SFX-only turns) call
+    cancel_all() instead, so they do not count as misses.
+    """
+
+    def __init__(self, prefetch, max_workers=SPECULATIVE_CANDIDATES):
+        self.prefetch = prefetch
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self._pending = {}  # (voice_key, mood_key) -> (future, cancel event)
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1),
+                                            thread_name_prefix="speculative")
+
+    def start(self, dialogue, candidates):
+        """Starts prefetching dialogue for each (voice_key, mood_key) candidate."""
+        self.cancel_all()
+        for voice_key, mood_key in candidates:
+            cancelled = threading.Event()
+            future = self._executor.submit(self._run, dialogue, voice_key, mood_key, cancelled)
+            self._pending[(voice_key, mood_key)] = (future, cancelled)
+
+    def _run(self, dialogue, voice_key, mood_key, cancelled):
+        if cancelled.is_set():
+            return False
+        try:
+            return self.prefetch(dialogue, voice_key, mood_key, cancelled)
+        except Exception as e:  # The real render simply does the work itself
+            print(f"⚠️ Warning: Speculative synthesis failed ({voice_key}, {mood_key}): {e}")
+            return False
+
+    def resolve(self, voice_key, mood_key):
+        """
+        Settles the speculation for the chosen pair: waits for its prefetch
+        and cancels the others. Returns True if the choice was prefetched.
+        """
+        speculated = bool(self._pending)
+        match = self._pending.pop((voice_key, mood_key), None)
+        self.cancel_all()
+        if match is None:
+            self.misses += speculated  # Nothing was prefetched, so nothing was missed
+            return False
+        future, _ = match
+        prefetched = future.result()
+        if prefetched:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return prefetched
+
+    def cancel_all(self):
+        """Drops every pending prefetch. `cancelled` counts those that never started."""
+        for future, cancelled in self._pending.values():
+            cancelled.set()  # A prefetch already streaming stops at its next chunk
+            self.cancelled += future.cancel()
+        self._pending = {}
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "cancelled": self.cancelled}
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,164 @@
+# stream_player.py
+
+import shutil
+import queue
+import subprocess
+import threading
+import time
+from audio_formats import parse_output_format, PCM_SAMPLE_WIDTH, PCM_CHANNELS
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+FFMPEG_BINARY = shutil.which("ffmpeg") or "ffmpeg"
+STREAM_BLOCK_SECONDS = 0.25  # Size of each PCM block handed to the mixer
+FEEDER_JOIN_SECONDS = 5.0  # A feeder stuck on the API stream is left behind (daemon thread)
+
+# -------------------------------------------------------------
+# 2. THE STREAMER (Incremental Decode + Channel Queueing)
+
+def _feed_decoder(audio_chunks, decoder_stdin, errors):
+    """Writes API chunks into the decoder as they arrive (runs on its own thread)."""
+    try:
+        for chunk in audio_chunks:
+            decoder_stdin.write(chunk)
+            decoder_stdin.flush()
+    except Exception as e:  # API errors surface here, while the stream is consumed
+        errors.append(e)
+    finally:
+        try:
+            decoder_stdin.close()
+        except OSError:
+            pass
+
+def prefetch_chunks(audio_chunks):
+    """
+    Starts consuming a convert() generator on a background thread right away
+    and returns an iterator over the buffered chunks. Lets the API request
+    run while earlier audio is still playing.
+    """
+    chunks = queue.Queue()
+    done = object()
+
+    def pump():
+        try:
+            for chunk in audio_chunks:
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        chunks.put(done)
+
+    threading.Thread(target=pump, daemon=True).start()
+
+    def drain():
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    return drain()
+
+def _decoded_blocks(audio_chunks, input_args, frequency, channels, bytes_per_block):
+    """Yields mixer-format PCM blocks from an ffmpeg decoder fed with the chunks."""
+    decoder = subprocess.Popen(
+        [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+         *input_args, "-i", "pipe:0",
+         "-f", "s16le", "-ac", str(channels), "-ar", str(frequency), "pipe:1"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    errors = []
+    feeder = threading.Thread(
+        target=_feed_decoder, args=(audio_chunks, decoder.stdin, errors), daemon=True
+    )
+    feeder.start()
+    finished = False
+    try:
+        while True:
+            block = decoder.stdout.read(bytes_per_block)
+            if not block:
+                break
+            yield block
+        finished = True
+    finally:
+        if not finished:
+            # Consumer stopped early: nobody reads stdout any more, so ffmpeg
+            # (and the feeder writing into it) would block forever
+            decoder.kill()
+        decoder.stdout.close()
+        feeder.join(FEEDER_JOIN_SECONDS)
+        decoder.wait()
+
+    if errors:
+        raise errors[0]
+
+def _pcm_blocks(audio_chunks, channels, bytes_per_block):
+    """Yields mixer-format blocks from raw PCM already at the mixer rate: no decoder."""
+    from pydub import AudioSegment
+
+    source_block = bytes_per_block // channels  # Mono in, `channels` out
+    pending = bytearray()
+
+    def upmix(data):
+        return AudioSegment(data=bytes(data), sample_width=PCM_SAMPLE_WIDTH, frame_rate=1,
+                            channels=PCM_CHANNELS).set_channels(channels).raw_data
+
+    for chunk in audio_chunks:
+        pending += chunk
+        while len(pending) >= source_block:
+            yield upmix(pending[:source_block])
+            del pending[:source_block]
+    usable = len(pending) - len(pending) % PCM_SAMPLE_WIDTH
+    if usable:
+        yield upmix(pending[:usable])
+
+def stream_play(audio_chunks, input_format="mp3", started_at=None):
+    """
+    Plays audio while the convert() generator is still yielding chunks.
+    input_format is the convert() output_format ('mp3_44100_128', 'pcm_44100')
+    or a bare codec. PCM at the mixer rate goes straight to the mixer; other
+    input is piped through an ffmpeg decoder. The PCM is queued on a mixer
+    channel block by block. Blocks until playback has finished.
+    Returns the time-to-first-sample in seconds (None if nothing played).
+    """
+    import pygame  # Only needed for playback
+
+    started_at = started_at if started_at is not None else time.perf_counter()
+    frequency, size, channels = pygame.mixer.get_init()
+    bytes_per_block = int(frequency * STREAM_BLOCK_SECONDS) * channels * (abs(size) // 8)
+
+    codec, sample_rate, _ = parse_output_format(input_format)
+    if codec == "pcm" and sample_rate == frequency and abs(size) // 8 == PCM_SAMPLE_WIDTH:
+        blocks = _pcm_blocks(audio_chunks, channels, bytes_per_block)
+    elif codec == "pcm":
+        blocks = _decoded_blocks(audio_chunks, ["-f", "s16le", "-ar", str(sample_rate), "-ac", str(PCM_CHANNELS)],
+                                 frequency, channels, bytes_per_block)
+    else:
+        blocks = _decoded_blocks(audio_chunks, ["-f", codec], frequency, channels, bytes_per_block)
+
+    channel = None
+    time_to_first_sample = None
+    try:
+        for block in blocks:
+            sound = pygame.mixer.Sound(buffer=block)
+
+            if channel is None:
+                channel = sound.play()
+                time_to_first_sample = time.perf_counter() - started_at
+                continue
+
+            # A channel holds one queued sound; wait for the slot to free up
+            while channel.get_queue() is not None:
+                time.sleep(0.01)
+            channel.queue(sound)
+    finally:
+        blocks.close()
+
+    # Wait until the last queued block finishes playing
+    while channel is not None and channel.get_busy():
+        time.sleep(0.05)
+
+    return time_to_first_sample
@@ -0,0 +1,149 @@
+# synthesis_cache.py
+
+import hashlib
+import os
+import tempfile
+import threading
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION
+
+CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".tts_cache")
+CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 512 * 1024 * 1024))  # 512 MB
+CACHE_SUFFIX = ".audio"
+
+# -------------------------------------------------------------
+# 2. THE CACHE (Content-addressed store for convert() results)
+
+def synthesis_key(voice_id, model_id, text, output_format):
+    """Returns the content hash that identifies one rendered line."""
+    digest = hashlib.sha256()
+    for part in (voice_id, model_id, text, output_format):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")  # Field separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+class SynthesisCache:
+    """
+    On-disk cache of text_to_speech.convert() results.
+    Entries are written atomically (temp file + os.replace) so several
+    processes can share one cache directory. The file mtime doubles as
+    the LRU clock: hits touch the entry, eviction removes the oldest.
+    The directory is only created by the first put().
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def contains(self, key):
+        """True if key is cached (does not count as a hit or touch the entry)."""
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """Returns the cached bytes for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as most recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Atomically stores data under key, then enforces the size bound."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError as e:
+            print(f"⚠️ Warning: Could not write synthesis cache entry: {e}")
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"⚠️ Warning: Could not write synthesis cache entry: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return  # Nothing stored yet
+        for name in names:
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # Removed by a concurrent process
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def convert(self, client, text, voice_id, model_id, output_format):
+        """
+        Drop-in replacement for client.text_to_speech.convert().
+        Returns an iterator of byte chunks; on a miss the API stream is
+        passed through and stored once it has been fully consumed.
+        """
+        key = synthesis_key(voice_id, model_id, text, output_format)
+        data = self.get(key)
+        if data is not None:
+            return iter([data])
+
+        audio_data_generator = client.text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+        )
+        return self._store_when_complete(key, audio_data_generator)
+
+    def _store_when_complete(self, key, chunks):
+        collected = []
+        for chunk in chunks:
+            collected.append(chunk)
+            yield chunk
+        self.put(key, b"".join(collected))
+
+    def stats(self):
+        """Returns the hit/miss counters for this process."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            hit_rate = self.hits / lookups if lookups else 0.0
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": hit_rate}
@@ -0,0 +1,213 @@
+# timeline_renderer.py
+
+import numpy as np
+from audio_formats import MIXER_CHANNELS, MIXER_FREQUENCY
+from numpy_mixer import (INT16_SCALE, array_to_segment, as_mix_array,
+                         layer_envelope, layer_frames, make_layer, mix_layer_blocks, mix_layers,
+                         ms_to_frames, soft_limit)
+
+# -------------------------------------------------------------
+# 1. CONFIGURATION (Music Bed & Ducking)
+
+MUSIC_GAIN_DB = -10.0  # Bed level under the scene
+MUSIC_FADE_IN_MS = 1500
+MUSIC_FADE_OUT_MS = 3000
+
+DUCK_DEPTH_DB = -12.0  # Extra music attenuation while dialogue is speaking
+DUCK_THRESHOLD_DB = -45.0  # Dialogue level (block RMS) that counts as speech
+DUCK_ATTACK_MS = 80  # Music starts dipping this long before the dialogue
+DUCK_RELEASE_MS = 500  # ...and stays down this long after it
+ENVELOPE_BLOCK_MS = 10  # Resolution of the envelope follower
+RENDER_BLOCK_MS = 1000  # Scene mixed this much at a time (a multiple of ENVELOPE_BLOCK_MS)
+
+# -------------------------------------------------------------
+# 2. SIDECHAIN DUCKING (Vectorized Envelope Follower)
+
+def envelope_follower(samples, block_ms=ENVELOPE_BLOCK_MS):
+    """Block RMS of a (frames, channels) float array: one level per block_ms."""
+    block = max(ms_to_frames(block_ms), 1)
+    blocks = -(-len(samples) // block)
+    padded = np.zeros(blocks * block, dtype=np.float32)
+    padded[:len(samples)] = np.abs(samples).max(axis=1) if len(samples) else 0.0
+    return np.sqrt(np.mean(padded.reshape(blocks, block) ** 2, axis=1)), block
+
+def ducking_gain(sidechain, frames, depth_db=DUCK_DEPTH_DB, threshold_db=DUCK_THRESHOLD_DB,
+                 attack_ms=DUCK_ATTACK_MS, release_ms=DUCK_RELEASE_MS, block_ms=ENVELOPE_BLOCK_MS):
+    """
+    Per-frame gain (length `frames`) for a music bed ducked under `sidechain`.
+    Offline, so the follower can look ahead: every block above the threshold
+    holds the duck from attack_ms before it to release_ms after it, and the
+    on/off curve is smoothed into ramps with a moving average.
+    """
+    levels, block = envelope_follower(sidechain, block_ms)
+    if not len(levels):
+        return np.ones(frames, dtype=np.float32)
+    block_centers, block_gain = ducking_curve(levels, block, depth_db, threshold_db, attack_ms, release_ms, block_ms)
+    return np.interp(np.arange(frames), block_centers, block_gain).astype(np.float32)
+
+def ducking_curve(levels, block, depth_db=DUCK_DEPTH_DB, threshold_db=DUCK_THRESHOLD_DB,
+                  attack_ms=DUCK_ATTACK_MS, release_ms=DUCK_RELEASE_MS, block_ms=ENVELOPE_BLOCK_MS):
+    """
+    The duck for envelope-follower levels, as (block centers in frames, gain
+    per block): interpolate it at any frame range (see ducking_gain()).
+    """
+    speaking = (levels > 10 ** (threshold_db / 20)).astype(np.float32)
+
+    # Dilate the speech mask: any speech in [i - release, i + attack] ducks block i
+    attack_blocks = max(int(round(attack_ms / block_ms)), 1)
+    release_blocks = max(int(round(release_ms / block_ms)), 1)
+    hold = np.convolve(speaking, np.ones(attack_blocks + release_blocks + 1, dtype=np.float32))
+    ducked = hold[attack_blocks:attack_blocks + len(speaking)] > 0
+
+    block_gain = np.where(ducked, np.float32(10 ** (depth_db / 20)), np.float32(1.0))
+    # Moving average over attack_blocks turns the steps into ramps (edges held, not faded)
+    padded = np.pad(block_gain, (attack_blocks // 2, attack_blocks - 1 - attack_blocks // 2), mode="edge")
+    block_gain = np.convolve(padded, np.full(attack_blocks, 1.0 / attack_blocks, dtype=np.float32),
+                             mode="valid")
+
+    block_centers = np.arange(len(block_gain)) * block + block / 2
+    return block_centers, block_gain
+
+# -------------------------------------------------------------
+# 3. THE TIMELINE (Whole-scene, One-pass Render)
+
+class SceneTimeline:
+    """
+    A scene laid out end to end: each turn's dialogue, its SFX placements
+    (offsets relative to the turn) and an optional music bed looped under
+    the whole scene and ducked whenever dialogue is speaking.
+    render_blocks() mixes everything in one pass, a block at a time, from
+    the turns' own (int16) samples; render() collects the blocks.
+    """
+
+    def __init__(self, gap_ms=0):
+        self.gap_ms = gap_ms
+        self.turns = []  # {"start_ms", "dialogue": layer, "sfx": [layers]}
+        self.music = None
+        self.duration_ms = 0
+
+    def add_turn(self, dialogue, sfx=(), dialogue_gain_db=0.0):
+        """
+        Appends a turn after the previous one. dialogue is an AudioSegment or
+        array; sfx is a list of numpy_mixer layers placed relative to the turn
+        start. SFX may ring on under the next turn. Returns the turn start (ms).
+        """
+        start_ms = self.duration_ms + (self.gap_ms if self.turns else 0)
+        dialogue_layer = make_layer(dialogue, offset_ms=start_ms, gain_db=dialogue_gain_db)
+        sfx_layers = [dict(layer, offset_ms=start_ms + layer["offset_ms"]) for layer in sfx]
+        self.turns.append({"start_ms": start_ms, "dialogue": dialogue_layer, "sfx": sfx_layers})
+        self.duration_ms = start_ms + len(dialogue_layer["samples"]) * 1000 / MIXER_FREQUENCY
+        return start_ms
+
+    def set_music(self, samples, gain_db=MUSIC_GAIN_DB, fade_in_ms=MUSIC_FADE_IN_MS,
+                  fade_out_ms=MUSIC_FADE_OUT_MS, duck=True):
+        """Sets the bed: PCM bytes (mixer format), an AudioSegment or an array."""
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.int16).reshape(-1, MIXER_CHANNELS)
+        self.music = {"samples": as_mix_array(samples), "gain_db": gain_db,
+                      "fade_in_ms": fade_in_ms, "fade_out_ms": fade_out_ms, "duck": duck}
+
+    def _layers(self):
+        dialogue = [turn["dialogue"] for turn in self.turns]
+        sfx = [layer for turn in self.turns for layer in turn["sfx"]]
+        return dialogue, sfx
+
+    def frames(self):
+        """Length of the rendered scene in frames."""
+        dialogue, sfx = self._layers()
+        return layer_frames(dialogue + sfx)
+
+    def _duck_curve(self, dialogue_layers, frames, block_frames):
+        """Ducking curve from the dialogue, followed block by block (no full-length sidechain)."""
+        levels = [envelope_follower(block)[0] for _, block in mix_layer_blocks(dialogue_layers, frames, block_frames)]
+        return ducking_curve(np.concatenate(levels), max(ms_to_frames(ENVELOPE_BLOCK_MS), 1))
+
+    def _music_block(self, start, stop, frames, duck_curve):
+        """Frames [start, stop) of the bed: looped, faded over the scene and ducked."""
+        music = self.music["samples"]
+        envelope = layer_envelope(frames, self.music["gain_db"], ms_to_frames(self.music["fade_in_ms"]),
+                                  ms_to_frames(self.music["fade_out_ms"]), start, stop)
+        if duck_curve is not None:
+            envelope *= np.interp(np.arange(start, stop), *duck_curve).astype(np.float32)
+        if music.dtype == np.int16:
+            envelope *= np.float32(1.0 / INT16_SCALE)
+        return music[np.arange(start, stop) % len(music)] * envelope[:, None]
+
+    def render_blocks(self, limit=True, block_ms=RENDER_BLOCK_MS):
+        """
+        Mixes the scene a block at a time: yields float32 (frames, MIXER_CHANNELS)
+        blocks that concatenate to render(). Memory is one block of the mix,
+        whatever the length of the scene.
+        """
+        dialogue, sfx = self._layers()
+        frames = layer_frames(dialogue + sfx)
+        envelope_block = max(ms_to_frames(ENVELOPE_BLOCK_MS), 1)
+        block_frames = max(ms_to_frames(block_ms) // envelope_block, 1) * envelope_block  # Whole follower blocks
+
+        with_music = self.music is not None and len(self.music["samples"]) and frames
+        duck_curve = None
+        if with_music and self.music["duck"] and dialogue:
+            duck_curve = self._duck_curve(dialogue, frames, block_frames)
+
+        for start, block in mix_layer_blocks(dialogue + sfx, frames, block_frames):
+            if with_music:
+                block += self._music_block(start, start + len(block), frames, duck_curve)
+            yield soft_limit(block) if limit else block
+
+    def render(self, limit=True):
+        """Mixes the whole scene into one float32 (frames, MIXER_CHANNELS) array."""
+        mix = np.empty((self.frames(), MIXER_CHANNELS), dtype=np.float32)
+        position = 0
+        for block in self.render_blocks(limit=limit):
+            mix[position:position + len(block)] = block
+            position += len(block)
+        return mix
+
+    def render_segment(self, limit=True):
+        """render() as an AudioSegment in the mixer format."""
+        return array_to_segment(self.render(limit=limit))
+
+# -------------------------------------------------------------
+# 4. PROGRESSIVE MIXING (Turn by Turn, for Streaming Export)
+
+class ProgressiveTimeline:
+    """
+    SceneTimeline's layout (no music bed), mixed one turn at a time.
+    add_turn() returns the frames that can no longer change: everything up
+    to the end of the turn's dialogue. SFX ringing past it are held back
+    and mixed under the next turn; flush() returns what is left at the end.
+    The concatenated output equals SceneTimeline.render().
+    """
+
+    def __init__(self, gap_ms=0, limit=True):
+        self.gap_ms = gap_ms
+        self.limit = limit
+        self.turns = 0
+        self.frames_emitted = 0
+        self._pending = np.zeros((0, MIXER_CHANNELS), dtype=np.float32)  # Overhang from earlier turns
+
+    def add_turn(self, dialogue, sfx=(), dialogue_gain_db=0.0):
+        """Mixes the next turn; returns the finished float32 (frames, MIXER_CHANNELS) block."""
+        start_ms = self.gap_ms if self.turns else 0
+        dialogue_layer = make_layer(dialogue, offset_ms=start_ms, gain_db=dialogue_gain_db)
+        sfx_layers = [dict(layer, offset_ms=start_ms + layer["offset_ms"]) for layer in sfx]
+        mix = mix_layers([dialogue_layer] + sfx_layers, limit=False)
+
+        # Lay the held-back overhang under the start of this turn
+        if len(self._pending) > len(mix):
+            mix = np.concatenate([mix, np.zeros((len(self._pending) - len(mix), MIXER_CHANNELS), np.float32)])
+        mix[:len(self._pending)] += self._pending
+
+        turn_end = ms_to_frames(start_ms) + len(dialogue_layer["samples"])
+        block, self._pending = mix[:turn_end], mix[turn_end:]
+        self.turns += 1
+        return self._emit(block)
+
+    def flush(self):
+        """Returns the remaining overhang (SFX tails after the last dialogue)."""
+        block, self._pending = self._pending, np.zeros((0, MIXER_CHANNELS), dtype=np.float32)
+        return self._emit(block)
+
+    def _emit(self, block):
+        self.frames_emitted += len(block)
+        return soft_limit(block) if self.limit else block